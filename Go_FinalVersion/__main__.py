@@ -2,6 +2,9 @@ from PyQt5.QtWidgets import QApplication
 from go import Go
 import sys
 
-app = QApplication([])
-myGo = Go()
-sys.exit(app.exec_())
+# the engine processes import the modules of the game, they must not
+# start another window
+if __name__ == '__main__':
+    app = QApplication([])
+    myGo = Go()
+    sys.exit(app.exec_())
@@ -0,0 +1,247 @@
+"""Aggregate statistics over large collections of game records.
+
+Usage:
+    python analytics.py games/*.sgf --workers 8
+    python analytics.py games/*.sgf --scaling 8 --limit 20000
+
+The records are read lazily and sent in chunks to a process pool. Every
+worker replays its chunk with GameLogic and returns a partial Aggregate,
+the partial aggregates are merged as they arrive. Only a fixed nr. of
+chunks is in flight at any time, so the memory used does not depend on the
+size of the corpus: an Aggregate holds counters, never games.
+"""
+import argparse
+from collections import Counter
+import itertools
+import json
+import multiprocessing
+import time
+
+from game_logic import GameLogic
+import position_cache
+import records
+
+
+class Aggregate(object):
+    """Statistics of a set of games, per board size.
+    Attributes:
+        games (Counter): size -> nr. of games
+        moves (Counter): size -> nr. of moves (passes included)
+        passes (Counter): size -> nr. of passes
+        capture_moves (Counter): size -> nr. of moves that captured stones
+        captured (Counter): size -> nr. of captured stones
+        ko_moves (Counter): size -> nr. of moves that started or retook a ko
+        broken (Counter): size -> nr. of games that stopped at an illegal move or setup stone
+        heatmaps (dict): size -> flat list (index y * size + x) of move counts
+        lengths (dict): size -> Counter of game lengths
+        margins (dict): size -> Counter of score_game() margins (> 0: black ahead)
+    """
+
+    COUNTERS = ['games', 'moves', 'passes', 'capture_moves', 'captured', 'ko_moves', 'broken']
+
+    def __init__(self):
+        for name in self.COUNTERS:
+            setattr(self, name, Counter())
+        self.heatmaps = {}
+        self.lengths = {}
+        self.margins = {}
+
+    def add(self, record):
+        """Replays a game record and counts it"""
+        size = record.size
+        game = GameLogic(size)
+        heatmap = self.heatmaps.setdefault(size, [0] * (size * size))
+
+        length = 0
+        if not record.setup_board(game):
+            self.broken[size] += 1
+            return
+        for i, move in enumerate(record.moves):
+            if move is None:
+                record.play(game, i)
+                self.passes[size] += 1
+            else:
+                captured = sum(game.captured)
+                x, y = move
+                if not (0 <= x < size and 0 <= y < size) or not record.play(game, i):
+                    self.broken[size] += 1
+                    break
+                heatmap[y * size + x] += 1
+                if sum(game.captured) > captured:
+                    self.capture_moves[size] += 1
+                    self.captured[size] += sum(game.captured) - captured
+                if game.blocked_field is not None:
+                    self.ko_moves[size] += 1
+            length += 1
+            if game.game_over:
+                break
+
+        self.games[size] += 1
+        self.moves[size] += length
+        self.lengths.setdefault(size, Counter())[length] += 1
+        score, _ = game.score_game()
+        self.margins.setdefault(size, Counter())[score] += 1
+
+    def merge(self, other):
+        """Adds the counts of another Aggregate"""
+        for name in self.COUNTERS:
+            getattr(self, name).update(getattr(other, name))
+        for size, heatmap in other.heatmaps.items():
+            mine = self.heatmaps.setdefault(size, [0] * len(heatmap))
+            for i, count in enumerate(heatmap):
+                mine[i] += count
+        for size, lengths in other.lengths.items():
+            self.lengths.setdefault(size, Counter()).update(lengths)
+        for size, margins in other.margins.items():
+            self.margins.setdefault(size, Counter()).update(margins)
+
+    def to_dict(self):
+        """JSON compatible representation, keys are the board sizes"""
+        data = {name: dict(getattr(self, name)) for name in self.COUNTERS}
+        data['heatmaps'] = self.heatmaps
+        data['lengths'] = {size: dict(c) for size, c in self.lengths.items()}
+        data['margins'] = {size: dict(c) for size, c in self.margins.items()}
+        return data
+
+    def report(self):
+        """Prints the statistics per board size"""
+        for size in sorted(self.games):
+            games, moves = self.games[size], max(self.moves[size], 1)
+            print("{0}x{0}: {1} games, {2} moves, {3} broken records".format(
+                size, games, self.moves[size], self.broken[size]))
+            print("  captures: {:.2f}% of the moves, {:.2f} stones per game".format(
+                100.0 * self.capture_moves[size] / moves, self.captured[size] / games))
+            print("  ko: {:.2f}% of the moves, passes: {:.2f}% of the moves".format(
+                100.0 * self.ko_moves[size] / moves, 100.0 * self.passes[size] / moves))
+            print("  length:  " + _summary(self.lengths[size]))
+            margins = self.margins[size]
+            black = sum(n for m, n in margins.items() if m > 0)
+            print("  margin:  " + _summary(margins) + ", black ahead in {:.1f}%".format(100.0 * black / games))
+            print("  move frequency:")
+            for line in heatmap_lines(self.heatmaps[size], size):
+                print("    " + line)
+
+
+def _percentile(histogram, fraction):
+    """The value below which the given fraction of a Counter's mass lies"""
+    target = fraction * sum(histogram.values())
+    seen = 0
+    for value in sorted(histogram):
+        seen += histogram[value]
+        if seen >= target:
+            return value
+    return 0
+
+
+def _summary(histogram):
+    total = sum(histogram.values())
+    mean = sum(v * n for v, n in histogram.items()) / float(max(total, 1))
+    return "mean {:.1f}, min {}, median {}, p90 {}, max {}".format(
+        mean, min(histogram), _percentile(histogram, 0.5), _percentile(histogram, 0.9), max(histogram))
+
+
+def heatmap_lines(heatmap, size, shades=' .:-=+*#%@'):
+    """Renders a heatmap as text, one line per row, darker = more played"""
+    top = max(heatmap) or 1
+    return [' '.join(shades[min(heatmap[y * size + x] * len(shades) // (top + 1), len(shades) - 1)]
+                     for x in range(size))
+            for y in range(size)]
+
+
+def _init_worker():
+    # final positions hardly ever repeat, caching their scores only costs memory
+    position_cache.set_default_cache(None)
+
+
+def analyse_chunk(chunk):
+    """Runs in a worker process: replays a list of GameRecords
+
+    Returns:
+        (Aggregate): the partial aggregate of the chunk
+    """
+    aggregate = Aggregate()
+    for record in chunk:
+        aggregate.add(record)
+    return aggregate
+
+
+def chunks(games, chunk_size):
+    """Cuts an iterator of records into lists of chunk_size records"""
+    while True:
+        chunk = list(itertools.islice(games, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def analyse(paths, workers=None, chunk_size=200, limit=None, in_flight=2):
+    """Streams the records of the files through a process pool.
+
+    Pool.imap would read the whole corpus ahead in its feeder thread, so
+    chunks are submitted one by one and at most in_flight chunks per worker
+    are waiting or running at any time.
+
+    Arguments:
+        paths (list): SGF files or session journals
+        workers (int): nr. of processes, all cores by default
+        chunk_size (int): nr. of games sent to a worker at once
+        limit (int): stop after this many games
+        in_flight (int): max. nr. of chunks per worker that are submitted but not merged
+
+    Returns:
+        (tuple): the merged Aggregate and the elapsed seconds
+    """
+    workers = workers or multiprocessing.cpu_count()
+    games = records.iter_games(paths)
+    if limit is not None:
+        games = itertools.islice(games, limit)
+
+    total = Aggregate()
+    pending = []
+    start = time.perf_counter()
+    with multiprocessing.Pool(workers, initializer=_init_worker) as pool:
+        for chunk in chunks(games, chunk_size):
+            pending.append(pool.apply_async(analyse_chunk, (chunk,)))
+            if len(pending) >= workers * in_flight:
+                total.merge(pending.pop(0).get())
+        for result in pending:
+            total.merge(result.get())
+    return total, time.perf_counter() - start
+
+
+def scaling(paths, max_workers=None, chunk_size=200, limit=None):
+    """Runs the pipeline with 1, 2, 4, ... max_workers processes and prints
+    games/sec and the scaling efficiency (speedup / nr. of processes)"""
+    max_workers = max_workers or multiprocessing.cpu_count()
+    counts = sorted({min(2 ** i, max_workers) for i in range(max_workers.bit_length() + 1)})
+    base = None
+    print("workers  games/s  speedup  efficiency")
+    for workers in counts:
+        aggregate, elapsed = analyse(paths, workers, chunk_size, limit)
+        rate = sum(aggregate.games.values()) / elapsed
+        base = base or rate
+        print("{:7d}  {:7.0f}  {:7.2f}  {:9.0f}%".format(workers, rate, rate / base, 100.0 * rate / base / workers))
+    return aggregate
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Statistics over game records')
+    parser.add_argument('games', nargs='+', help='SGF files or session journals')
+    parser.add_argument('--workers', type=int, default=None, help='nr. of processes (default: all cores)')
+    parser.add_argument('--chunk', type=int, default=200, help='nr. of games per chunk')
+    parser.add_argument('--limit', type=int, default=None, help='only the first LIMIT games')
+    parser.add_argument('--scaling', type=int, default=None, metavar='N',
+                        help='measure games/sec with 1, 2, 4 ... N processes')
+    parser.add_argument('--json', default=None, help='also write the statistics to this file')
+    args = parser.parse_args()
+
+    if args.scaling:
+        aggregate = scaling(args.games, args.scaling, args.chunk, args.limit)
+    else:
+        aggregate, elapsed = analyse(args.games, args.workers, args.chunk, args.limit)
+        games = sum(aggregate.games.values())
+        print("{} games in {:.1f} s ({:.0f} games/s)".format(games, elapsed, games / elapsed))
+    aggregate.report()
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(aggregate.to_dict(), f)
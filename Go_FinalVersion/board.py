@@ -1,7 +1,10 @@
 from game_logic import GameLogic, BLACK, WHITE
-from PyQt5.QtWidgets import QFrame
+from timeline import GameTimeline
+from workers import AnalysisWorker
+import journal
+from PyQt5.QtWidgets import QFrame, QSlider
 from PyQt5.QtCore import Qt, QBasicTimer, pyqtSignal, QPoint, QRect
-from PyQt5.QtGui import QPainter, QColor
+from PyQt5.QtGui import QPainter, QColor, QPixmap
 from piece import Piece
 
 
@@ -11,6 +14,9 @@ class Board(QFrame):  # base the board on a QFrame widget
     player_turn_signal = pyqtSignal(bool)
     black_timer_signal = pyqtSignal(int)
     white_timer_signal = pyqtSignal(int)
+    suggestion_signal = pyqtSignal(str)  # signal sent when the background analysis has a better move
+    score_signal = pyqtSignal(str)  # signal sent when the score of the finished game is known
+    engine_pass_signal = pyqtSignal()  # signal sent when the engine wants to pass
 
     boardWidth = 7  # board is 7 squares wide
     boardHeight = 7  # board is 7 squares high
@@ -20,12 +26,22 @@ class Board(QFrame):  # base the board on a QFrame widget
     black_counter = 120000  # timer default is milliseconds
     square_size = 70
     radius = square_size // 2 - 10
+    journal_path = "go_session.journal"  # every move is logged here to recover after a crash
 
     def __init__(self, parent):
         super().__init__(parent)
         self.game = None
+        self.replaying = False
+        self.journal = journal.Journal(self.journal_path)
         self.init_board()
 
+        # engine moves, pondering and scoring run in background threads
+        self.worker = AnalysisWorker(self)
+        self.worker.move_ready.connect(self.play_engine_move)
+        self.worker.ponder_ready.connect(self.show_suggestion)
+        self.worker.score_ready.connect(self.show_score)
+        self.worker.ownership_ready.connect(self.update_ownership)
+
     def init_board(self):
         """initiates board"""
         self.is_started = False  # game is not currently started
@@ -47,6 +63,18 @@ class Board(QFrame):  # base the board on a QFrame widget
             # Append the column to the array.
             self.board_array.append(column_elements)
 
+        # move slider to scrub through the moves of the game
+        self.timeline = GameTimeline(Board.boardWidth + 1)
+        self.move_slider = QSlider(Qt.Horizontal, self)
+        self.move_slider.setGeometry(self.shift(), self.square_size * (Board.boardHeight + 1),
+                                     self.square_size * Board.boardWidth, 30)
+        self.move_slider.setRange(0, 0)
+        self.move_slider.valueChanged.connect(self.show_move)
+
+        # territory estimate, drawn from a cached layer
+        self.show_ownership = False
+        self.ownership_layer = None
+
         self.print_board_array()
 
     def print_board_array(self):
@@ -83,8 +111,45 @@ class Board(QFrame):  # base the board on a QFrame widget
         self.is_started = True  # set the boolean which determines if the game has started to TRUE
         self.timer.start(self.timerSpeed, self)  # start the timer with the correct speed
         self.game = GameLogic(self.boardWidth+1)
+        self.timeline = GameTimeline(self.boardWidth + 1)
+        if not self.replaying:
+            self.journal.append('start', size=self.boardWidth + 1, speed_go=self.speed_go)
         print("start () - timer is started")
 
+    def recover_session(self):
+        """replays the game that was in progress when the application stopped
+        (from the journal). Returns the 'start' event of that game or None"""
+        session = journal.unfinished_session(self.journal_path)
+        if session is None:
+            return None
+
+        self.replaying = True
+        self.start()
+        for event in session[1:]:
+            if event['type'] == 'move':
+                self.try_move(event['y'], event['x'])
+            elif event['type'] == 'pass':
+                self.pass_turn(True)
+            elif event['type'] == 'rewind':
+                self.rewind(event['moves'])
+            if 'black_ms' in event:
+                Board.black_counter = event['black_ms']
+                Board.white_counter = event['white_ms']
+        self.replaying = False
+
+        self.player_black_turn = self.game.turn == BLACK
+        self.player_turn_signal.emit(self.player_black_turn)
+        if session[0].get('speed_go'):
+            self.speed_go = True
+            if self.player_black_turn:
+                self.black_timer.start(self.timerSpeed, self)
+            else:
+                self.white_timer.start(self.timerSpeed, self)
+        self.worker.ponder(self.game)
+        self.update()
+        print("recovered {} moves from {}".format(len(self.timeline), self.journal_path))
+        return session[0]
+
     def timerEvent(self, event):
         """this event is automatically called when the timer is updated. based on the timerSpeed variable """
         if self.is_started:
@@ -127,6 +192,8 @@ class Board(QFrame):  # base the board on a QFrame widget
         painter = QPainter(self)
         self.draw_board_squares(painter)
         painter.resetTransform()
+        if self.show_ownership and self.ownership_layer is not None and not self.is_reviewing():
+            painter.drawPixmap(0, 0, self.ownership_layer)
         self.draw_pieces(painter)
 
     def mousePressEvent(self, event):
@@ -140,12 +207,19 @@ class Board(QFrame):  # base the board on a QFrame widget
         if point is None:
             return
 
+        # a move on an earlier position continues the game from there
+        if self.is_reviewing():
+            self.rewind(self.timeline.position)
+
+        self.play_move(row, col)
+        self.clickLocationSignal.emit(click_loc)
+
+    def play_move(self, row, col):
+        """plays a move for the player whose turn it is and switches the clocks"""
         is_legal = self.try_move(row, col)
         if is_legal:
             self.repaint()
 
-        self.clickLocationSignal.emit(click_loc)
-
         if self.player_black_turn:
             self.player_black_turn = False
             if self.speed_go:
@@ -159,6 +233,62 @@ class Board(QFrame):  # base the board on a QFrame widget
 
         self.player_turn_signal.emit(self.player_black_turn)
 
+    def engine_move(self):
+        """asks the engine for a move in the background, see play_engine_move"""
+        if not self.is_started or self.is_reviewing():
+            return
+        if self.speed_go:
+            remaining = Board.black_counter if self.game.turn == BLACK else Board.white_counter
+            self.worker.request_move(self.game, remaining_ms=remaining)
+        else:
+            self.worker.request_move(self.game)
+
+    def play_engine_move(self, move):
+        """plays the move found by the engine"""
+        if not self.is_started:
+            return
+        if move is None:
+            self.engine_pass_signal.emit()
+            return
+        x, y = move
+        self.play_move(y, x)
+
+    def set_show_ownership(self, show):
+        """switches the territory overlay on or off"""
+        self.show_ownership = show
+        if show and self.is_started and self.ownership_layer is None:
+            self.worker.request_ownership(self.game)
+        self.update()
+
+    def update_ownership(self, ownership):
+        """renders a new territory estimate into the overlay layer. Only done
+        when a new estimate arrives, paintEvent just draws the layer."""
+        size = self.boardWidth + 1
+        layer = QPixmap(self.size())
+        layer.fill(Qt.transparent)
+        painter = QPainter(layer)
+        painter.setPen(Qt.NoPen)
+        cell = self.square_size * 4 // 5
+        for i, value in enumerate(ownership):
+            if abs(value) < 0.1:
+                continue
+            y, x = divmod(i, size)
+            alpha = int(abs(value) * 160)
+            colour = QColor(0, 0, 0, alpha) if value > 0 else QColor(255, 255, 255, alpha)
+            painter.fillRect(self.shift() + self.square_size * x - cell // 2,
+                             self.shift() + self.square_size * y - cell // 2, cell, cell, colour)
+        painter.end()
+        self.ownership_layer = layer
+        self.update()
+
+    def show_suggestion(self, result):
+        """shows the best move found while pondering"""
+        move, winrate = result
+        if move is None:
+            text = "pass"
+        else:
+            text = "row {}, col {} ({:.0f}%)".format(move[1], move[0], winrate * 100)
+        self.suggestion_signal.emit(text)
 
     def pass_turn(self, var):
         if not self.is_started:
@@ -171,6 +301,7 @@ class Board(QFrame):  # base the board on a QFrame widget
             if is_game_over:
                 return False
             else:
+                self.record_move(None)
                 internal_turn = self.game.turn
                 if internal_turn == WHITE:
                     self.player_black_turn = False
@@ -193,13 +324,20 @@ class Board(QFrame):  # base the board on a QFrame widget
         if not self.is_started:
             return
 
-        score, positionScored = self.game.score_game()
+        # scored in the background, see show_score
+        self.worker.request_score(self.game)
+
+    def show_score(self, result):
+        """prints the score of the finished game"""
+        score, positionScored = result
         if score > 0:
-            print("B+{}".format(score))
+            text = "B+{}".format(score)
         elif score < 0:
-            print("W+{}".format(-score))
+            text = "W+{}".format(-score)
         else:
-            print("Jigo")
+            text = "Jigo"
+        print(text)
+        self.score_signal.emit(text)
 
     def reset_game(self):
         """clears pieces from the board"""
@@ -223,6 +361,14 @@ class Board(QFrame):  # base the board on a QFrame widget
                 self.white_timer.stop()
         self.speed_go = False
         self.game.__init__(self.boardWidth + 1)
+        self.journal.append('reset')
+        self.timeline = GameTimeline(self.boardWidth + 1)
+        self.move_slider.blockSignals(True)
+        self.move_slider.setRange(0, 0)
+        self.move_slider.blockSignals(False)
+        self.worker.position_changed()
+        self.worker.new_game(Board.black_counter)
+        self.ownership_layer = None
         self.update()
 
     def try_move(self, new_x, new_y):
@@ -232,8 +378,83 @@ class Board(QFrame):  # base the board on a QFrame widget
         # if legal, update the bord
         if is_legal:
             self.board_array = self.game._stones()
+            self.record_move((new_y, new_x))
         return is_legal
 
+    def record_move(self, move):
+        """adds a move (None for a pass) to the timeline and moves the slider to it"""
+        self.timeline.record(self.game, move)
+        self.move_slider.blockSignals(True)
+        self.move_slider.setRange(0, len(self.timeline))
+        self.move_slider.setValue(len(self.timeline))
+        self.move_slider.blockSignals(False)
+        self.update_slider_tooltip()
+        if self.replaying:
+            return
+
+        # queued only, the journal writes to disk in its own thread
+        if move is None:
+            self.journal.append('pass', black_ms=Board.black_counter, white_ms=Board.white_counter)
+        else:
+            self.journal.append('move', x=move[0], y=move[1],
+                                black_ms=Board.black_counter, white_ms=Board.white_counter)
+
+        # the old analysis is useless now, think about the new position
+        self.worker.position_changed()
+        self.worker.ponder(self.game)
+        self.ownership_layer = None
+        if self.show_ownership:
+            self.worker.request_ownership(self.game)
+
+    def rewind(self, moves):
+        """continues the game from the position after the given nr. of moves,
+        the later moves are dropped"""
+        self.timeline.seek(moves)
+        self.timeline.truncate()
+        self.game = self.timeline.to_game()
+        self.board_array = self.game._stones()
+        self.move_slider.blockSignals(True)
+        self.move_slider.setRange(0, len(self.timeline))
+        self.move_slider.setValue(len(self.timeline))
+        self.move_slider.blockSignals(False)
+        self.update_slider_tooltip()
+
+        # the player to move may have changed, and with it the running clock
+        self.player_black_turn = self.game.turn == BLACK
+        self.player_turn_signal.emit(self.player_black_turn)
+        if self.speed_go and not self.replaying:
+            if self.player_black_turn:
+                self.white_timer.stop()
+                self.black_timer.start(self.timerSpeed, self)
+            else:
+                self.black_timer.stop()
+                self.white_timer.start(self.timerSpeed, self)
+        if self.replaying:
+            return
+
+        self.journal.append('rewind', moves=moves)
+        self.worker.position_changed()
+        self.worker.ponder(self.game)
+        self.ownership_layer = None
+        if self.show_ownership:
+            self.worker.request_ownership(self.game)
+        self.update()
+
+    def is_reviewing(self):
+        """True while the slider shows an earlier move than the last one"""
+        return self.move_slider.value() < len(self.timeline)
+
+    def show_move(self, move_number):
+        """shows the position after the given move, called by the slider"""
+        self.timeline.seek(move_number)
+        self.board_array = self.timeline.stones()
+        self.update_slider_tooltip()
+        self.update()
+
+    def update_slider_tooltip(self):
+        self.move_slider.setToolTip("Move {} / {} (timeline: {:.1f} kB)".format(
+            self.timeline.position, len(self.timeline), self.timeline.memory_usage() / 1024))
+
     def draw_board_squares(self, painter):
         """draw all the square on the board"""
 
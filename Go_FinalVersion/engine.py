@@ -0,0 +1,226 @@
+import random
+import time
+
+from patterns import PatternBoard
+import position_cache
+from tactics import tactical_moves
+
+
+def with_patterns(game):
+    """The game itself if it keeps its pattern codes up to date, otherwise a
+    copy that does. The engine needs them, the rules alone do not."""
+    if game.patterns is not None:
+        return game
+    game = game.copy()
+    game.patterns = PatternBoard(game)
+    return game
+
+
+def play_weighted(game, rng):
+    """Plays a move drawn by the 3x3 pattern weights for the player to move.
+    Illegal draws (ko, suicide) are suppressed and drawn again.
+
+    Returns:
+        (tuple): the (x, y) played, None if no move was legal (nothing played)
+    """
+    patterns = game.patterns
+    suppressed = []
+    move = patterns.sample(game.turn, rng)
+    while move is not None and not game.place_stone(*move):
+        patterns.suppress(*move)
+        suppressed.append(move)
+        move = patterns.sample(game.turn, rng)
+    patterns.restore(suppressed)
+    return move
+
+
+def random_playout(game, rng, max_moves=None):
+    """Plays moves chosen by the 3x3 pattern weights until both players pass.
+    The game is changed, so pass a copy.
+
+    Returns:
+        (tuple): score_game() of the final position (score > 0: black wins)
+    """
+    if max_moves is None:
+        max_moves = 3 * game.size * game.size
+
+    game = with_patterns(game)
+    moves = 0
+    while not game.game_over and moves < max_moves:
+        if play_weighted(game, rng) is None:
+            game.passing()
+        moves += 1
+
+    # final positions hardly ever repeat, so they are not cached
+    return game._score_game()
+
+
+def estimate_ownership(game, playouts=512, batch=16, rng=None, is_cancelled=None, report=None):
+    """Estimates for every field how likely it ends as black or white territory
+    (or stone) by scoring random playouts from the current position.
+
+    Arguments:
+        game (GameLogic): the position, it is not changed
+        playouts (int): total nr. of playouts
+        batch (int): nr. of playouts between two reports
+        is_cancelled (function): returns True when the estimate is not needed anymore
+        report (function): receives the intermediate estimate after every batch
+
+    Returns:
+        (list): flat list (index y * size + x) with values from -1 (surely white)
+                to 1 (surely black)
+    """
+    cache = position_cache.default_cache()
+    if cache is not None:
+        cached = cache.get(game, 'ownership')
+        if cached is not None:
+            return cached
+
+    rng = rng or random.Random()
+    game = with_patterns(game)
+    totals = [0] * (game.size * game.size)
+    played = 0
+    while played < playouts:
+        if is_cancelled is not None and is_cancelled():
+            return [t / played for t in totals] if played else totals
+        for _ in range(min(batch, playouts - played)):
+            _, position_scored = random_playout(game.copy(), rng)
+            for i, color in enumerate(position_scored):
+                if color is True:
+                    totals[i] += 1
+                elif color is False:
+                    totals[i] -= 1
+            played += 1
+        if report is not None:
+            report([t / played for t in totals])
+
+    ownership = [t / played for t in totals]
+    if cache is not None:
+        cache.put(game, 'ownership', ownership)
+    return ownership
+
+
+class Engine(object):
+    """Computer player based on pattern weighted random playouts.
+
+    For the most promising candidate moves (by 3x3 pattern weight) playouts
+    are run in rounds, one per candidate, and the move with the best winning
+    rate is chosen. Results of complete searches go to the position cache.
+    In the opening, moves from an opening book are played without searching.
+    Attributes:
+        playouts (int): default nr. of playouts per search
+        width (int): nr. of candidate moves that are searched
+        book (OpeningBook): opening book, None for no book
+        book_moves (int): the book is used for the first book_moves moves
+    """
+
+    def __init__(self, playouts=400, width=12, seed=None, book=None, book_moves=20):
+        self.playouts = playouts
+        self.width = width
+        self.rng = random.Random(seed)
+        self.book = book
+        self.book_moves = book_moves
+
+    def book_move(self, game):
+        """A move from the opening book, None when out of book.
+
+        Returns:
+            (tuple): ((x, y) or None for a pass, winning rate of the move)
+        """
+        if self.book is None:
+            return None
+        # every stone on the board or captured was one move (passes aside)
+        played = sum(1 for row in game.board for grp in row if grp is not None) + sum(game.captured)
+        if played >= self.book_moves:
+            return None
+        return self.book.choose(game, self.rng)
+
+    def candidate_moves(self, game):
+        """Captures and escapes found by the tactical reader first, then the
+        moves with the highest pattern weights. They may still be illegal
+        (ko, suicide)"""
+        game = with_patterns(game)
+        moves = tactical_moves(game)
+        candidates = sorted(game.patterns.candidates(game.turn), key=lambda c: -c[1])
+        for move, _ in candidates:
+            if len(moves) >= self.width:
+                break
+            if move not in moves:
+                moves.append(move)
+        return moves
+
+    def genmove(self, game, playouts=None, deadline=None, is_cancelled=None, report=None):
+        """Chooses a move for the player to move.
+
+        Arguments:
+            game (GameLogic): the position, it is not changed
+            playouts (int): max. nr. of playouts, self.playouts by default
+            deadline (float): time.perf_counter() value when the search must stop
+            is_cancelled (function): returns True when the result is not needed anymore
+            report (function): receives the intermediate (move, winrate) after every round
+
+        Returns:
+            (tuple): ((x, y) or None for a pass, winning rate of the move)
+        """
+        book = self.book_move(game)
+        if book is not None:
+            return book
+
+        cache = position_cache.default_cache()
+        if cache is not None:
+            cached = cache.get(game, 'move')
+            if cached is not None:
+                return cached
+
+        result, complete = self.search(game, playouts or self.playouts, deadline, is_cancelled, report)
+        if complete and cache is not None:
+            cache.put(game, 'move', result)
+        return result
+
+    def search(self, game, playouts, deadline=None, is_cancelled=None, report=None):
+        """Runs the playouts, see genmove.
+
+        Returns:
+            (tuple, bool): the (move, winrate) and whether all playouts were run
+        """
+        game = with_patterns(game)
+        moves = self.candidate_moves(game)
+        if not moves:
+            return (None, 0.0), True
+
+        color = game.turn
+        stats = {move: [0.0, 0] for move in moves}
+        played = 0
+        while played < playouts:
+            if is_cancelled is not None and is_cancelled():
+                return self._best(stats), False
+            if deadline is not None and time.perf_counter() >= deadline:
+                return self._best(stats), False
+
+            for (x, y) in list(moves):
+                playout = game.copy()
+                if not playout.place_stone(x, y):
+                    moves.remove((x, y))
+                    del stats[(x, y)]
+                    continue
+                score, _ = random_playout(playout, self.rng)
+                if score == 0:
+                    stats[(x, y)][0] += 0.5
+                elif (score > 0) == color:
+                    stats[(x, y)][0] += 1
+                stats[(x, y)][1] += 1
+                played += 1
+
+            if not moves:
+                return (None, 0.0), True
+            if report is not None:
+                report(self._best(stats))
+
+        return self._best(stats), True
+
+    def _best(self, stats):
+        best, best_rate = None, -1.0
+        for move, (wins, visits) in stats.items():
+            if visits and wins / visits > best_rate:
+                best, best_rate = move, wins / visits
+        return best, max(best_rate, 0.0)
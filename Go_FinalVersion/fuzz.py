@@ -0,0 +1,262 @@
+"""Differential fuzzing of alternative board engines against GameLogic.
+
+Usage:
+    python fuzz.py --candidate my_module:FastBoard --sequences 1000000 --workers 8
+
+Seeded random and adversarial move sequences (ko fights, large captures,
+suicide attempts) are run in lockstep through GameLogic and the candidate.
+After every step the return value, blocked_field, captured and the turn
+are compared, at the end the stones and score_game(). The first divergence
+is minimized and printed as a reproducer. A candidate needs the same
+interface as GameLogic: Class(size), place_stone(x, y), passing(),
+get_data(), score_game() and the attributes blocked_field, captured, turn.
+"""
+import argparse
+import importlib
+import multiprocessing
+import random
+import time
+
+from game_logic import GameLogic
+import position_cache
+
+GENERATORS = ['random', 'ko', 'capture', 'suicide']
+
+
+def load_engine(spec):
+    """Imports 'module:Class'"""
+    module, name = spec.split(':')
+    return getattr(importlib.import_module(module), name)
+
+
+def random_sequence(rng, size, length):
+    """Random moves, a few passes"""
+    return [None if rng.random() < 0.02 else (rng.randrange(size), rng.randrange(size))
+            for _ in range(length)]
+
+
+def ko_sequence(rng, size, length):
+    """Builds a ko shape at a random place and fights over it, with moves
+    elsewhere in between"""
+    cx, cy = rng.randrange(1, size - 2), rng.randrange(1, size - 1)
+    black = [(cx - 1, cy), (cx, cy - 1), (cx, cy + 1)]
+    white = [(cx + 2, cy), (cx + 1, cy - 1), (cx + 1, cy + 1)]
+    moves = []
+    for b, w in zip(black, white):
+        moves += [b, w]
+    # black fills the ko point, white captures, black retakes ...
+    moves += [(cx + 1, cy), (cx, cy)]
+    while len(moves) < length:
+        r = rng.random()
+        if r < 0.5:
+            moves.append((cx + 1, cy) if rng.random() < 0.5 else (cx, cy))
+        elif r < 0.6:
+            moves.append(None)
+        else:
+            moves.append((rng.randrange(size), rng.randrange(size)))
+    return moves[:length]
+
+
+def capture_sequence(rng, size, length):
+    """Black fills a rectangle while white surrounds it, so that large
+    groups are captured"""
+    w, h = rng.randrange(1, size - 1), rng.randrange(1, size - 1)
+    x0, y0 = rng.randrange(0, size - w + 1), rng.randrange(0, size - h + 1)
+    inside = [(x, y) for x in range(x0, x0 + w) for y in range(y0, y0 + h)]
+    border = set()
+    for (x, y) in inside:
+        for (u, v) in [(x-1, y), (x+1, y), (x, y-1), (x, y+1)]:
+            if 0 <= u < size and 0 <= v < size and (u, v) not in inside:
+                border.add((u, v))
+    inside, border = rng.sample(inside, len(inside)), rng.sample(sorted(border), len(border))
+
+    moves = []
+    while inside or border:
+        moves.append(inside.pop() if inside else None)
+        moves.append(border.pop() if border else None)
+    moves += random_sequence(rng, size, max(0, length - len(moves)))
+    return moves[:length]
+
+
+def suicide_sequence(rng, size, length):
+    """Random moves, but most moves go to points that are surrounded by
+    stones, mostly suicide attempts or captures"""
+    moves = random_sequence(rng, size, length // 2)
+    while len(moves) < length:
+        x, y = rng.randrange(size), rng.randrange(size)
+        moves += [(u, v) for (u, v) in [(x-1, y), (x+1, y), (x, y-1), (x, y+1)]
+                  if 0 <= u < size and 0 <= v < size]
+        moves.append((x, y))
+    return moves[:length]
+
+
+def make_sequence(kind, seed, size, length):
+    rng = random.Random(seed)
+    generator = {
+        'random': random_sequence,
+        'ko': ko_sequence,
+        'capture': capture_sequence,
+        'suicide': suicide_sequence,
+    }[kind]
+    return generator(rng, size, length)
+
+
+def _step(game, move):
+    if move is None:
+        result = game.passing()
+    else:
+        result = game.place_stone(*move)
+    return (result, game.blocked_field, tuple(game.captured), game.turn, game.game_over)
+
+
+def _final(game):
+    score, position_scored = game.score_game()
+    return (game.get_data()['stones'], score, list(position_scored))
+
+
+def _observe(function, *args):
+    """Calls function(*args), an exception becomes an observation that can be
+    compared and reported like a result"""
+    try:
+        return function(*args)
+    except Exception as e:
+        return ('raised', type(e).__name__, str(e))
+
+
+def compare(reference, candidate, size, moves, timings=None):
+    """Runs the moves in lockstep through both engines.
+
+    An exception in either engine is an observation too, so a candidate that
+    raises where the reference does not diverges at that step.
+
+    Arguments:
+        timings (list): [reference seconds, candidate seconds], increased in place
+
+    Returns:
+        (tuple): (index of the first diverging step or len(moves) for the final
+                  position, reference observation, candidate observation),
+                 None if both engines agree
+    """
+    timings = timings if timings is not None else [0.0, 0.0]
+    ref = reference(size)
+    try:
+        cand = candidate(size)
+    except Exception as e:
+        return 0, 'created', ('raised', type(e).__name__, str(e))
+    for i, move in enumerate(moves):
+        start = time.perf_counter()
+        expected = _observe(_step, ref, move)
+        middle = time.perf_counter()
+        actual = _observe(_step, cand, move)
+        timings[0] += middle - start
+        timings[1] += time.perf_counter() - middle
+        if expected != actual:
+            return i, expected, actual
+
+    expected, actual = _observe(_final, ref), _observe(_final, cand)
+    if expected != actual:
+        return len(moves), expected, actual
+    return None
+
+
+def minimize(reference, candidate, size, moves):
+    """Removes as many moves as possible while the engines still diverge
+    (delta debugging: drop chunks, halving the chunk size)"""
+    # nothing after the divergence is needed
+    divergence = compare(reference, candidate, size, moves)
+    moves = moves[:divergence[0] + 1]
+
+    chunk = len(moves) // 2
+    while chunk >= 1:
+        i = 0
+        while i < len(moves):
+            shorter = moves[:i] + moves[i + chunk:]
+            if shorter and compare(reference, candidate, size, shorter) is not None:
+                moves = shorter
+            else:
+                i += chunk
+        chunk //= 2
+    return moves
+
+
+def _init_worker():
+    # cached scores would hide differences between the engines
+    position_cache.set_default_cache(None)
+
+
+def run_chunk(task):
+    """Runs a block of seeds in a worker process.
+
+    Returns:
+        (dict): nr. of sequences & moves, time per engine and the first
+                divergence (kind, seed, minimized moves, details) or None
+    """
+    candidate_spec, kind, first_seed, count, size, length = task
+    reference, candidate = GameLogic, load_engine(candidate_spec)
+    timings = [0.0, 0.0]
+    moves_played = 0
+    for seed in range(first_seed, first_seed + count):
+        moves = make_sequence(kind, seed, size, length)
+        divergence = compare(reference, candidate, size, moves, timings)
+        # a divergence stops the sequence, the moves after it were not played
+        moves_played += len(moves) if divergence is None else min(divergence[0] + 1, len(moves))
+        if divergence is not None:
+            reproducer = minimize(reference, candidate, size, moves)
+            details = compare(reference, candidate, size, reproducer)
+            return {'sequences': seed - first_seed + 1, 'moves': moves_played, 'timings': timings,
+                    'divergence': (kind, seed, reproducer, details)}
+    return {'sequences': count, 'moves': moves_played, 'timings': timings, 'divergence': None}
+
+
+def fuzz(candidate_spec, sequences=10000, size=9, length=120, workers=None, seed=0, chunk=200):
+    """Runs the fuzzer on a process pool and prints the throughput per engine.
+
+    Returns:
+        the first divergence (kind, seed, moves, details) or None
+    """
+    tasks = []
+    for i, first in enumerate(range(seed, seed + sequences, chunk)):
+        count = min(chunk, seed + sequences - first)
+        tasks.append((candidate_spec, GENERATORS[i % len(GENERATORS)], first, count, size, length))
+
+    totals = {'sequences': 0, 'moves': 0, 'timings': [0.0, 0.0]}
+    divergence = None
+    start = time.perf_counter()
+    with multiprocessing.Pool(workers, initializer=_init_worker) as pool:
+        for result in pool.imap_unordered(run_chunk, tasks):
+            totals['sequences'] += result['sequences']
+            totals['moves'] += result['moves']
+            totals['timings'][0] += result['timings'][0]
+            totals['timings'][1] += result['timings'][1]
+            if result['divergence'] is not None:
+                divergence = result['divergence']
+                pool.terminate()
+                break
+    elapsed = time.perf_counter() - start
+
+    print("{} sequences, {} moves on {}x{} in {:.1f} s ({:.0f} moves/s overall)".format(
+        totals['sequences'], totals['moves'], size, size, elapsed, totals['moves'] / elapsed))
+    for name, seconds in zip(['reference', candidate_spec], totals['timings']):
+        print("{}: {:.0f} moves/s".format(name, totals['moves'] / seconds if seconds else 0.0))
+
+    if divergence is None:
+        print("no divergence")
+    else:
+        kind, seed, moves, (step, expected, actual) = divergence
+        print("DIVERGENCE in {} sequence, seed {}".format(kind, seed))
+        print("minimized reproducer ({} moves): {}".format(len(moves), moves))
+        print("step {}: reference {} != candidate {}".format(step, expected, actual))
+    return divergence
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--candidate', default='game_logic:GameLogic',
+                        help='engine to test as module:Class (default: GameLogic itself)')
+    parser.add_argument('--sequences', type=int, default=10000)
+    parser.add_argument('--size', type=int, default=9)
+    parser.add_argument('--length', type=int, default=120, help='moves per sequence')
+    parser.add_argument('--workers', type=int, default=None, help='processes (default: all cores)')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    fuzz(args.candidate, args.sequences, args.size, args.length, args.workers, args.seed)
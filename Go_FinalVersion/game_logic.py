@@ -1,5 +1,7 @@
 from PyQt5.QtCore import QObject, pyqtSignal
 from itertools import chain
+from patterns import PatternBoard
+import position_cache
 
 
 
@@ -53,9 +55,15 @@ NOPIECE = None
 
 class GameLogic(QObject):
     """ This class takes care of all the calculations and the game logic"""
-    def __init__(self, n=8):
+    def __init__(self, n=8, patterns=False):
         super().__init__(parent=None)
-        """This function initializes a new """
+        """This function initializes a new game.
+
+        Arguments:
+            n (int): board size
+            patterns (bool): keep the 3x3 pattern codes up to date (for the
+                             engine), which makes every move several times slower
+        """
         # gameplay attributes
         self.size = n
         self.turn = BLACK
@@ -80,6 +88,12 @@ class GameLogic(QObject):
         # stones killed during the game
         self.captured = [0, 0] 
 
+        # fields whose content changed with the last move
+        self.last_changes = []
+
+        # 3x3 pattern codes of the empty fields, updated after every move
+        self.patterns = PatternBoard(self) if patterns else None
+
     def passing(self):
         """Action when a player passes his turn.
 
@@ -270,6 +284,13 @@ class GameLogic(QObject):
         else:
             return False
 
+        # remember the changed fields & update the affected patterns
+        self.last_changes = [(x, y)]
+        for grp in groups_to_kill:
+            self.last_changes.extend(grp.stones)
+        if self.patterns is not None:
+            self.patterns.update(self, self.last_changes)
+
         # ko-rule: block the field where the stone has just been placed
         # conditions
         # 1. the new group has only one stone
@@ -287,6 +308,77 @@ class GameLogic(QObject):
 
         return True
 
+    def copy(self):
+        """Returns an independent copy of the game, e.g. for playouts or for
+        analysing the position in another thread. Groups are never changed
+        once they are on the board, so the copy shares them."""
+        other = GameLogic.__new__(GameLogic)
+        QObject.__init__(other)
+        other.size = self.size
+        other.turn = self.turn
+        other.blocked_field = self.blocked_field
+        other.has_passed = self.has_passed
+        other.game_over = self.game_over
+        other.board = [row[:] for row in self.board]
+        other.territory = [row[:] for row in self.territory]
+        other.neighbors = self.neighbors
+        other.score = self.score[:]
+        other.captured = self.captured[:]
+        other.last_changes = self.last_changes[:]
+        other.patterns = self.patterns.copy() if self.patterns is not None else None
+        return other
+
+    def snapshot(self):
+        """Returns the position in a compact form that can be stored or sent to
+        another process: (size, fields, state) with fields a bytes object
+        (index y * size + x, 0 = empty, 1 = black, 2 = white) and state the
+        tuple (turn, blocked_field, has_passed, game_over, captured black,
+        captured white)"""
+        fields = bytearray(self.size * self.size)
+        for y, row in enumerate(self.board):
+            for x, grp in enumerate(row):
+                if grp is not None:
+                    fields[y * self.size + x] = 1 if grp.color else 2
+        state = (self.turn, self.blocked_field, self.has_passed, self.game_over,
+                 self.captured[0], self.captured[1])
+        return self.size, bytes(fields), state
+
+    @classmethod
+    def from_snapshot(cls, snapshot, patterns=False):
+        """Builds a game from snapshot(), the groups are found by flood fill"""
+        size, fields, state = snapshot
+        logic = cls(size)
+        seen = set()
+        for start in range(size * size):
+            if fields[start] == 0 or start in seen:
+                continue
+            # flood fill the group of this stone
+            color = fields[start]
+            grp = Group(color=(color == 1))
+            stack = [start]
+            seen.add(start)
+            while stack:
+                y, x = divmod(stack.pop(), size)
+                grp.stones.add((x, y))
+                for (u, v) in [(x-1, y), (x+1, y), (x, y-1), (x, y+1)]:
+                    if u < 0 or v < 0 or u >= size or v >= size:
+                        continue
+                    n = v * size + u
+                    if fields[n] == color:
+                        if n not in seen:
+                            seen.add(n)
+                            stack.append(n)
+                    else:
+                        grp.border.add((u, v))
+            logic._add(grp)
+
+        (logic.turn, logic.blocked_field, logic.has_passed, logic.game_over,
+         black, white) = state
+        logic.captured = [black, white]
+        if patterns:
+            logic.patterns = PatternBoard(logic)
+        return logic
+
     def initializeNeighbors(self):
         """Caching the neighbors to quickly get them when necessary"""
         for point in range(self.size * self.size):
@@ -320,8 +412,16 @@ class GameLogic(QObject):
 
     def score_game(self):
         """Calculating the score by considering territories of certain color as actual pieces of it, then
-        get the difference
+        get the difference. Positions that have been scored before (also rotated or mirrored) are taken
+        from the position cache.
         """
+        cache = position_cache.default_cache()
+        if cache is None:
+            return self._score_game()
+        return cache.fetch(self, 'score', self._score_game)
+
+    def _score_game(self):
+        """Computes the score of the current position, see score_game"""
         board = self._stones()[:] 
         positionScored = list(chain.from_iterable(board))
         position = positionScored[:]
@@ -3,6 +3,7 @@ from PyQt5.QtWidgets import QMainWindow, QDesktopWidget, QAction, QMessageBox
 from PyQt5.QtCore import Qt
 from board import Board
 from score_board import ScoreBoard
+from spectator import GameSource, SpectatorGrid
 
 
 class Go(QMainWindow):
@@ -36,6 +37,13 @@ class Go(QMainWindow):
         help_menu.addAction(rules_action)
         rules_action.triggered.connect(self.rules)
 
+        # watch many engine games at once
+        view_menu = main_menu.addMenu(" View")
+        spectate_action = QAction("Spectate Engine Games", self)
+        view_menu.addAction(spectate_action)
+        spectate_action.triggered.connect(self.spectate)
+        self.spectator = None
+
         self.board = Board(self)
         self.board.setMinimumWidth(735)
         self.board.setMinimumHeight(735)
@@ -45,6 +53,11 @@ class Go(QMainWindow):
         self.addDockWidget(Qt.RightDockWidgetArea, self.scoreBoard)
         self.scoreBoard.make_connection(self.board)
 
+        # continue the game that was interrupted by a crash
+        recovered = self.board.recover_session()
+        if recovered is not None:
+            self.scoreBoard.resume_game(recovered.get('speed_go', False))
+
         self.resize(800, 800)
         self.center()
         self.setWindowTitle('Go')
@@ -71,6 +84,17 @@ class Go(QMainWindow):
                                                     "\nTo end game pass your turn twice in a row. \n"
                                                     "\nPlayer with most territory and prisoners wins.")
 
+    def spectate(self):
+        """opens a window with 64 headless games"""
+        self.spectator = SpectatorGrid(GameSource(64))
+        self.spectator.show()
+
+    def closeEvent(self, event):
+        """stops the background analysis before the window closes"""
+        self.board.worker.shutdown()
+        self.board.journal.close()
+        super().closeEvent(event)
+
     def center(self):
         '''centers the window on the screen'''
         screen = QDesktopWidget().screenGeometry()
@@ -0,0 +1,150 @@
+import json
+import os
+import threading
+import time
+import zlib
+
+
+class Journal(object):
+    """Append-only event log that survives crashes.
+
+    Every event is one line '<crc32>\\t<json>\\n'. append() only queues the
+    line, a background thread writes the queued lines in batches and calls
+    fsync once per batch, so the caller (e.g. mousePressEvent) never waits
+    for the disk. A torn last line after a crash is cut off when the journal
+    is opened again, so new events never end up glued to it.
+    Attributes:
+        path (str): the journal file
+        flush_every (int): max. nr. of events per batch
+        flush_interval (float): max. seconds an event waits in the queue
+    """
+
+    def __init__(self, path, flush_every=64, flush_interval=0.2):
+        self.path = path
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.appended = 0
+        self.synced = 0
+        self.batches = 0
+
+        repair(path)
+        self._file = open(path, 'ab')
+        self._pending = []
+        self._closing = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name='journal', daemon=True)
+        self._thread.start()
+
+    def append(self, kind, **fields):
+        """Queues an event, e.g. append('move', x=3, y=4)"""
+        fields['type'] = kind
+        fields['t'] = time.time()
+        data = json.dumps(fields, separators=(',', ':')).encode()
+        line = b'%08x\t%s\n' % (zlib.crc32(data), data)
+        with self._cond:
+            self._pending.append(line)
+            self.appended += 1
+            if len(self._pending) >= self.flush_every:
+                self._cond.notify_all()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: len(self._pending) >= self.flush_every or self._closing,
+                                    timeout=self.flush_interval)
+                batch, self._pending = self._pending, []
+                closing = self._closing
+            if batch:
+                self._file.write(b''.join(batch))
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                with self._cond:
+                    self.synced += len(batch)
+                    self.batches += 1
+                    self._cond.notify_all()
+            if closing:
+                return
+
+    def flush(self):
+        """Blocks until everything appended so far is on disk"""
+        with self._cond:
+            target = self.appended
+            self._cond.notify_all()
+            self._cond.wait_for(lambda: self.synced >= target or not self._thread.is_alive())
+
+    def close(self):
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+        self._thread.join()
+        self._file.close()
+
+
+def repair(path):
+    """Truncates a journal file after its last complete line, a crash in the
+    middle of a write leaves an unterminated line at the end.
+
+    Returns:
+        (int): nr. of bytes cut off
+    """
+    if not os.path.exists(path):
+        return 0
+    with open(path, 'r+b') as f:
+        size = f.seek(0, os.SEEK_END)
+        # look for the last newline, reading backwards in blocks
+        end = size
+        while end > 0:
+            start = max(end - 4096, 0)
+            f.seek(start)
+            newline = f.read(end - start).rfind(b'\n')
+            if newline >= 0:
+                end = start + newline + 1
+                break
+            end = start
+        if end < size:
+            f.truncate(end)
+        return size - end
+
+
+def _parse(line):
+    """The event of a journal line, None if the line is damaged"""
+    checksum, _, data = line.rstrip(b'\n').partition(b'\t')
+    try:
+        if int(checksum, 16) != zlib.crc32(data):
+            return None
+        return json.loads(data)
+    except ValueError:
+        return None
+
+
+def read(path):
+    """Yields the events of a journal file. Damaged lines are skipped, reading
+    goes on with the next line."""
+    if not os.path.exists(path):
+        return
+    with open(path, 'rb') as f:
+        for line in f:
+            event = _parse(line)
+            if event is not None:
+                yield event
+
+
+def unfinished_session(path, game=None):
+    """Returns the events of the last game that was neither reset nor ended,
+    starting with its 'start' event, or None.
+
+    Arguments:
+        game (int): for journals of many games (see spectator.GameSource)
+                    only the events with this game index, None for the board
+    """
+    session = None
+    for event in read(path):
+        if event.get('game') != game:
+            continue
+        if event['type'] == 'start':
+            session = [event]
+        elif event['type'] in ('reset', 'end'):
+            session = None
+        elif session is not None:
+            session.append(event)
+    return session
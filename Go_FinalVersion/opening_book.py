@@ -0,0 +1,188 @@
+"""Opening book built from game records.
+
+    python opening_book.py build book.bin games/*.sgf --moves 20
+    python opening_book.py bench book.bin games/*.sgf
+
+The positions of the first moves of every game are canonicalized under the
+8 board symmetries (see position_cache.canonical_key) and the moves played
+there are counted together with their wins. The book file is a sorted
+array of fixed size records, which is memory-mapped at runtime: opening it
+costs nothing, all engine processes share the pages, and a lookup is a
+binary search.
+"""
+import argparse
+import mmap
+import os
+import random
+import struct
+import time
+
+from game_logic import GameLogic
+import position_cache
+from position_cache import canonical_key, inverse
+import records
+
+MAGIC = b'GOBOOK1\0'
+HEADER = struct.Struct('<8sI')
+# canonical position key, canonical move (PASS for a pass), times played, wins
+RECORD = struct.Struct('<16sHII')
+PASS = 0xFFFF
+
+DEFAULT_PATH = 'opening_book.bin'
+
+
+def build(paths, out_path, max_moves=20):
+    """Replays the games and writes the book.
+
+    Returns:
+        (int): nr. of (position, move) entries
+    """
+    stats = {}
+    games = broken = 0
+    for record in records.iter_games(paths):
+        game = GameLogic(record.size)
+        if not record.setup_board(game):
+            broken += 1
+            continue
+        for i, move in enumerate(record.moves[:max_moves]):
+            game.turn = record.colors[i]
+            key, perm = canonical_key(game, True)
+            # only legal moves are counted, the rest of a broken record is skipped
+            if not record.play(game, i):
+                broken += 1
+                break
+            if move is None:
+                canonical_move = PASS
+            else:
+                canonical_move = perm[move[1] * game.size + move[0]]
+            entry = stats.setdefault((key, canonical_move), [0, 0])
+            entry[0] += 1
+            if record.winner is not None and record.winner == record.colors[i]:
+                entry[1] += 1
+            if game.game_over:
+                break
+        games += 1
+
+    tmp_path = out_path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, len(stats)))
+        for (key, move), (count, wins) in sorted(stats.items()):
+            f.write(RECORD.pack(key, move, count, wins))
+    os.replace(tmp_path, out_path)
+    print("{} games ({} broken records), {} book entries written to {}".format(
+        games, broken, len(stats), out_path))
+    return len(stats)
+
+
+class OpeningBook(object):
+    """Read-only, memory-mapped opening book"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise ValueError('{} is not an opening book'.format(path))
+
+    @classmethod
+    def open_default(cls):
+        """The book in DEFAULT_PATH, None if there is none"""
+        if not os.path.exists(DEFAULT_PATH):
+            return None
+        return cls(DEFAULT_PATH)
+
+    def _key(self, i):
+        offset = HEADER.size + i * RECORD.size
+        return self._map[offset:offset + 16]
+
+    def lookup(self, game):
+        """Returns [((x, y) or None, times played, winrate), ...] for the
+        position, most played first. Empty if the position is not in the book."""
+        key, perm = canonical_key(game, True)
+        # binary search for the first record of the position
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+
+        back = None
+        moves = []
+        i = lo
+        while i < self.count and self._key(i) == key:
+            _, move, count, wins = RECORD.unpack_from(self._map, HEADER.size + i * RECORD.size)
+            if move == PASS:
+                point = None
+            else:
+                back = back or inverse(perm)
+                j = back[move]
+                point = (j % game.size, j // game.size)
+            moves.append((point, count, wins / count))
+            i += 1
+        moves.sort(key=lambda m: -m[1])
+        return moves
+
+    def choose(self, game, rng=None, min_count=2):
+        """A book move for the position, chosen proportionally to how often it
+        was played, or None when the book has nothing (reliable) to offer.
+
+        Returns:
+            (tuple): ((x, y) or None for a pass, winrate)
+        """
+        moves = [m for m in self.lookup(game) if m[1] >= min_count]
+        if not moves:
+            return None
+        rng = rng or random
+        r = rng.random() * sum(count for _, count, _ in moves)
+        for point, count, winrate in moves:
+            r -= count
+            if r < 0:
+                return point, winrate
+        return moves[-1][0], moves[-1][2]
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+
+def bench(book_path, paths, positions=2000):
+    """Measures the lookup latency on positions from the given games"""
+    book = OpeningBook(book_path)
+    games = []
+    for record in records.iter_games(paths):
+        game = GameLogic(record.size)
+        if not record.setup_board(game):
+            continue
+        for i in range(min(len(record.moves), 20)):
+            game.turn = record.colors[i]
+            games.append(game.copy())
+            if not record.play(game, i):
+                break
+        if len(games) >= positions:
+            break
+
+    hits = 0
+    start = time.perf_counter()
+    for game in games:
+        if book.lookup(game):
+            hits += 1
+    elapsed = time.perf_counter() - start
+    print("{} entries, {} lookups, {} hits, {:.1f} us per lookup".format(
+        book.count, len(games), hits, elapsed / max(len(games), 1) * 1e6))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build or benchmark an opening book')
+    parser.add_argument('command', choices=['build', 'bench'])
+    parser.add_argument('book')
+    parser.add_argument('games', nargs='+', help='SGF files or session journals')
+    parser.add_argument('--moves', type=int, default=20, help='nr. of opening moves to store')
+    args = parser.parse_args()
+    position_cache.set_default_cache(None)
+    if args.command == 'build':
+        build(args.games, args.book, args.moves)
+    else:
+        bench(args.book, args.games)
@@ -0,0 +1,446 @@
+from itertools import product
+import os
+import random
+import time
+
+# values of a single cell inside a 3x3 pattern (2 bits each)
+EMPTY = 0
+BLACK_STONE = 1
+WHITE_STONE = 2
+EDGE = 3
+
+# the 8 neighbours of a point, walked clockwise starting at the top left corner.
+# the orthogonal neighbours sit at the odd positions (1, 3, 5, 7).
+RING = [(-1, -1), (0, -1), (1, -1), (1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0)]
+ORTHOGONAL = [1, 3, 5, 7]
+
+# the atari flags of the 4 orthogonal neighbours are stored above the 16 ring bits
+ATARI_SHIFT = 16
+
+# weights are also kept as integers in units of 1 / RESOLUTION, so the running
+# sums used for sampling moves never drift
+RESOLUTION = 1024
+
+# the 8 board symmetries as permutations of the ring: 4 rotations (shifting the
+# clockwise ring by 2) and the same 4 rotations applied to the mirrored ring.
+_ROTATIONS = [[(i + 2 * r) % 8 for i in range(8)] for r in range(4)]
+_MIRROR = [(2 - i) % 8 for i in range(8)]
+SYMMETRIES = _ROTATIONS + [[rot[_MIRROR[i]] for i in range(8)] for rot in _ROTATIONS]
+
+
+def encode(cells, atari):
+    """Packs the 8 ring cells and the 4 orthogonal atari flags into one integer.
+
+    Arguments:
+        cells (list): 8 cell values, clockwise from the top left corner
+        atari (list): 4 booleans, one per orthogonal neighbour (N, E, S, W)
+    """
+    code = 0
+    for i, cell in enumerate(cells):
+        code |= cell << (2 * i)
+    for k, flag in enumerate(atari):
+        if flag:
+            code |= 1 << (ATARI_SHIFT + k)
+    return code
+
+
+def decode(code):
+    """Inverse of encode, returns (cells, atari)"""
+    cells = [(code >> (2 * i)) & 3 for i in range(8)]
+    atari = [bool(code >> (ATARI_SHIFT + k) & 1) for k in range(4)]
+    return cells, atari
+
+
+def transform(code, permutation):
+    """Applies one of the SYMMETRIES to a pattern code"""
+    cells, atari = decode(code)
+    new_cells = [0] * 8
+    new_atari = [False] * 4
+    for i in range(8):
+        new_cells[permutation[i]] = cells[i]
+    for k in range(4):
+        new_atari[(permutation[ORTHOGONAL[k]] - 1) // 2] = atari[k]
+    return encode(new_cells, new_atari)
+
+
+def swap_colors(code):
+    """Returns the same pattern seen from the other player"""
+    cells, atari = decode(code)
+    swap = {EMPTY: EMPTY, BLACK_STONE: WHITE_STONE, WHITE_STONE: BLACK_STONE, EDGE: EDGE}
+    return encode([swap[c] for c in cells], atari)
+
+
+def canonical(code):
+    """The smallest code among the 8 symmetric versions of a pattern"""
+    return min(transform(code, permutation) for permutation in SYMMETRIES)
+
+
+def heuristic_weight(code):
+    """Default playout weight of a pattern, seen from black (the player to move).
+
+    Captures and saving stones in atari are preferred, moves in contact with
+    other stones are preferred over empty areas, and filling an own eye is
+    never proposed.
+    """
+    cells, atari = decode(code)
+    orthogonal = [cells[i] for i in ORTHOGONAL]
+
+    # all direct neighbours are own stones (or the edge): an eye
+    if all(c in (BLACK_STONE, EDGE) for c in orthogonal) and not any(atari):
+        return 0.0
+
+    weight = 1.0
+    for k, cell in enumerate(orthogonal):
+        if not atari[k]:
+            continue
+        if cell == WHITE_STONE:
+            weight += 8.0   # capture
+        elif cell == BLACK_STONE:
+            weight += 4.0   # extend a group in atari
+    weight += 0.5 * sum(1 for c in cells if c in (BLACK_STONE, WHITE_STONE))
+
+    # empty first line moves are rarely useful
+    if EDGE in cells and all(c in (EMPTY, EDGE) for c in cells):
+        weight *= 0.5
+    return weight
+
+
+def _edge_layouts():
+    """Yields the ring positions that are off board for every possible location
+    of a point: the center, the 4 sides and the 4 corners."""
+    for dx, dy in product((-1, 0, 1), repeat=2):
+        off = set()
+        for i, (u, v) in enumerate(RING):
+            if (dx != 0 and u == dx) or (dy != 0 and v == dy):
+                off.add(i)
+        yield off
+
+
+def _valid_codes():
+    """Yields every pattern code that can occur on a board"""
+    for off in _edge_layouts():
+        free = [i for i in range(8) if i not in off]
+        for colors in product((EMPTY, BLACK_STONE, WHITE_STONE), repeat=len(free)):
+            cells = [EDGE] * 8
+            for i, c in zip(free, colors):
+                cells[i] = c
+            # only stones can be in atari
+            stones = [k for k in range(4) if cells[ORTHOGONAL[k]] in (BLACK_STONE, WHITE_STONE)]
+            for flags in product((False, True), repeat=len(stones)):
+                atari = [False] * 4
+                for k, flag in zip(stones, flags):
+                    atari[k] = flag
+                yield encode(cells, atari)
+
+
+class PatternTable(object):
+    """Weights of all valid 3x3 patterns, for both colours.
+
+    The weights are defined on the symmetry-reduced (canonical) patterns only
+    and are then expanded to every code, so a lookup is a single dict access.
+    Attributes:
+        weights (dict): code -> (weight for black, weight for white)
+        units (dict): code -> the same weights as integers (see RESOLUTION)
+        canonical_count (int): nr. of distinct patterns after symmetry reduction
+    """
+
+    def __init__(self, canonical_weights=None):
+        self.weights = {}
+        self.units = {}
+        self.canonical_count = 0
+        self._build(canonical_weights or {})
+
+    def _build(self, canonical_weights):
+        def weight_of(key):
+            if key in canonical_weights:
+                return canonical_weights[key]
+            return heuristic_weight(key)
+
+        for code in _valid_codes():
+            if code in self.weights:
+                continue
+            # all symmetric versions share the weights, so each orbit is
+            # computed once. the white weights come from the swapped orbit.
+            orbit = set(transform(code, permutation) for permutation in SYMMETRIES)
+            weights = (weight_of(min(orbit)), weight_of(min(swap_colors(c) for c in orbit)))
+            units = tuple(max(int(round(w * RESOLUTION)), 1) if w > 0 else 0 for w in weights)
+            for c in orbit:
+                self.weights[c] = weights
+                self.units[c] = units
+            self.canonical_count += 1
+
+    @classmethod
+    def from_file(cls, path):
+        """Loads canonical pattern weights from a text file with one
+        'code weight' pair per line. Missing patterns use the default heuristic."""
+        canonical_weights = {}
+        with open(path) as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith('#'):
+                    continue
+                code, weight = line.split()
+                canonical_weights[canonical(int(code))] = float(weight)
+        return cls(canonical_weights)
+
+    def weight(self, code, color):
+        """Weight of a pattern for the given player (True = black)"""
+        return self.weights[code][0 if color else 1]
+
+
+# trained weights ('code weight' per line, see PatternTable.from_file), the
+# heuristic weights are used if the file does not exist
+WEIGHTS_PATH = 'patterns.txt'
+
+_default_table = None
+
+
+def default_table():
+    """The pattern table shared by all games, built once on first use.
+    Building takes about a second, processes that need it call this at
+    startup (see workers.AnalysisWorker)."""
+    global _default_table
+    if _default_table is None:
+        if os.path.exists(WEIGHTS_PATH):
+            _default_table = PatternTable.from_file(WEIGHTS_PATH)
+        else:
+            _default_table = PatternTable()
+    return _default_table
+
+
+class PatternBoard(object):
+    """Keeps the 3x3 pattern code of every empty point of a GameLogic up to date.
+
+    Only the neighbourhoods touched by a move are recomputed: the 3x3 area
+    around every stone that was placed or captured, and the liberties of the
+    groups next to those stones (their atari flags may have changed).
+
+    For each player the weights of all points are kept in a Fenwick tree
+    (binary indexed tree) of running sums, so a move is drawn proportionally
+    to its weight in O(log n) and an update only touches the changed points,
+    instead of collecting all candidates for every move.
+    Attributes:
+        codes (list): size x size matrix with the pattern code of each empty
+                      field, None for occupied fields
+        table (PatternTable): weights used for the candidate lookups
+        totals (list): sum of the integer weights of all points, [black, white]
+    """
+
+    def __init__(self, logic, table=None):
+        self.size = logic.size
+        self.table = table if table is not None else default_table()
+        self.codes = [[None for i in range(self.size)] for j in range(self.size)]
+        for y in range(self.size):
+            for x in range(self.size):
+                self.codes[y][x] = self._code(logic, x, y, {})
+        self._build_trees()
+
+    def _build_trees(self):
+        """Builds the weight sums of both players from the codes in O(n)"""
+        n = self.size * self.size
+        units = self.table.units
+        self.units = [[0] * n, [0] * n]  # integer weight of every point (index y * size + x)
+        self.trees = [[0] * (n + 1), [0] * (n + 1)]
+        for y, row in enumerate(self.codes):
+            for x, code in enumerate(row):
+                if code is not None:
+                    self.units[0][y * self.size + x], self.units[1][y * self.size + x] = units[code]
+        for index in (0, 1):
+            tree = self.trees[index]
+            for i, u in enumerate(self.units[index]):
+                tree[i + 1] += u
+                parent = (i + 1) + ((i + 1) & -(i + 1))
+                if parent <= n:
+                    tree[parent] += tree[i + 1]
+        self.totals = [sum(self.units[0]), sum(self.units[1])]
+
+    def _set_units(self, i, black, white):
+        """Changes the integer weights of point i and the sums above it"""
+        n = len(self.units[0])
+        for index, u in ((0, black), (1, white)):
+            delta = u - self.units[index][i]
+            if delta == 0:
+                continue
+            self.units[index][i] = u
+            self.totals[index] += delta
+            tree = self.trees[index]
+            j = i + 1
+            while j <= n:
+                tree[j] += delta
+                j += j & -j
+
+    def _code(self, logic, x, y, liberties):
+        """Computes the pattern code of (x, y), None if the field is occupied.
+
+        Arguments:
+            liberties (dict): cache of group liberties, shared during one update
+        """
+        if logic.board[y][x] is not None:
+            return None
+        code = 0
+        for i, (dx, dy) in enumerate(RING):
+            u, v = x + dx, y + dy
+            if u < 0 or v < 0 or u >= self.size or v >= self.size:
+                code |= EDGE << (2 * i)
+                continue
+            grp = logic.board[v][u]
+            if grp is None:
+                continue
+            code |= (BLACK_STONE if grp.color else WHITE_STONE) << (2 * i)
+            if i & 1:
+                libs = liberties.get(id(grp))
+                if libs is None:
+                    libs = liberties[id(grp)] = logic._liberties(grp)
+                if libs == 1:
+                    code |= 1 << (ATARI_SHIFT + i // 2)
+        return code
+
+    def update(self, logic, changed):
+        """Recomputes the codes affected by a move.
+
+        Arguments:
+            logic (GameLogic): the game, after the move has been played
+            changed (list): coordinates of all fields whose content changed
+        """
+        dirty = set()
+        groups = {}
+        for (x, y) in changed:
+            for dx in (-1, 0, 1):
+                for dy in (-1, 0, 1):
+                    u, v = x + dx, y + dy
+                    if 0 <= u < self.size and 0 <= v < self.size:
+                        dirty.add((u, v))
+            for (u, v) in [(x, y), (x-1, y), (x+1, y), (x, y-1), (x, y+1)]:
+                if 0 <= u < self.size and 0 <= v < self.size:
+                    grp = logic.board[v][u]
+                    if grp is not None:
+                        groups[id(grp)] = grp
+
+        # the atari flags live on the liberties of the touched groups
+        for grp in groups.values():
+            dirty.update(grp.border)
+
+        liberties = {}
+        units = self.table.units
+        for (x, y) in dirty:
+            code = self.codes[y][x] = self._code(logic, x, y, liberties)
+            self._set_units(y * self.size + x, *(units[code] if code is not None else (0, 0)))
+        return len(dirty)
+
+    def copy(self):
+        other = PatternBoard.__new__(PatternBoard)
+        other.size = self.size
+        other.table = self.table
+        other.codes = [row[:] for row in self.codes]
+        other.units = [self.units[0][:], self.units[1][:]]
+        other.trees = [self.trees[0][:], self.trees[1][:]]
+        other.totals = self.totals[:]
+        return other
+
+    def code(self, x, y):
+        return self.codes[y][x]
+
+    def weight(self, x, y, color):
+        """O(1) lookup of the playout weight of the move (x, y) for a player,
+        0 for occupied fields"""
+        code = self.codes[y][x]
+        if code is None:
+            return 0.0
+        return self.table.weights[code][0 if color else 1]
+
+    def sample(self, color, rng):
+        """Draws an empty field with probability proportional to its weight
+        for the given player, in O(log n).
+
+        Returns:
+            (tuple): (x, y), None if no field has a positive weight
+        """
+        index = 0 if color else 1
+        if self.totals[index] <= 0:
+            return None
+        r = rng.randrange(self.totals[index])
+        # walk down the tree: find the first point whose running sum exceeds r
+        tree = self.trees[index]
+        n = len(tree) - 1
+        pos = 0
+        step = 1 << (n.bit_length() - 1)
+        while step:
+            nxt = pos + step
+            if nxt <= n and tree[nxt] <= r:
+                r -= tree[nxt]
+                pos = nxt
+            step >>= 1
+        return (pos % self.size, pos // self.size)
+
+    def suppress(self, x, y):
+        """Sets the weights of a field to 0 until restore(), e.g. after sample()
+        returned an illegal move (ko, suicide)"""
+        self._set_units(y * self.size + x, 0, 0)
+
+    def restore(self, fields):
+        """Gives suppressed fields the weights of their current codes again"""
+        for (x, y) in fields:
+            code = self.codes[y][x]
+            self._set_units(y * self.size + x, *(self.table.units[code] if code is not None else (0, 0)))
+
+    def candidates(self, color):
+        """Returns a list of ((x, y), weight) for every empty field with a
+        positive weight for the given player"""
+        result = []
+        index = 0 if color else 1
+        weights = self.table.weights
+        for y, row in enumerate(self.codes):
+            for x, code in enumerate(row):
+                if code is not None:
+                    w = weights[code][index]
+                    if w > 0:
+                        result.append(((x, y), w))
+        return result
+
+
+def benchmark(size=19, moves=300, seed=0):
+    """Plays random moves and measures the cost of the incremental pattern
+    update against a full recomputation of all codes."""
+    from game_logic import GameLogic
+
+    start = time.perf_counter()
+    default_table()
+    table_time = time.perf_counter() - start
+
+    rng = random.Random(seed)
+    game = GameLogic(size)
+    patterns = PatternBoard(game)
+    update_time = 0.0
+    full_time = 0.0
+    played = 0
+    for _ in range(moves * 4):
+        if played >= moves:
+            break
+        x, y = rng.randrange(size), rng.randrange(size)
+        # the game does not track the patterns itself, so the update is timed alone
+        if not game.place_stone(x, y):
+            continue
+        start = time.perf_counter()
+        patterns.update(game, game.last_changes)
+        update_time += time.perf_counter() - start
+
+        start = time.perf_counter()
+        PatternBoard(game, patterns.table)
+        full_time += time.perf_counter() - start
+        played += 1
+
+    print("pattern table: {} codes, {} canonical, built in {:.2f} s".format(
+        len(default_table().weights), default_table().canonical_count, table_time))
+    print("{} moves on {}x{}".format(played, size, size))
+    print("incremental update: {:.1f} us/move".format(update_time / played * 1e6))
+    print("full recomputation: {:.1f} us/move".format(full_time / played * 1e6))
+
+    samples = 10000
+    start = time.perf_counter()
+    for _ in range(samples):
+        patterns.sample(game.turn, rng)
+    print("weighted move sample: {:.1f} us".format((time.perf_counter() - start) / samples * 1e6))
+
+
+if __name__ == '__main__':
+    benchmark()
@@ -0,0 +1,321 @@
+import argparse
+from collections import OrderedDict
+from hashlib import blake2b
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# field values used for hashing a position
+_EMPTY, _BLACK, _WHITE, _BLOCKED = 0, 1, 2, 3
+
+_symmetry_cache = {}
+
+
+def symmetries(size):
+    """Returns the 8 board symmetries of a size x size board as index
+    permutations: perm[i] is where the field with flat index i (y * size + x)
+    ends up after the transformation."""
+    if size not in _symmetry_cache:
+        perms = []
+        n = size - 1
+        for transpose in (False, True):
+            for flip_x in (False, True):
+                for flip_y in (False, True):
+                    perm = []
+                    for i in range(size * size):
+                        y, x = divmod(i, size)
+                        if flip_x:
+                            x = n - x
+                        if flip_y:
+                            y = n - y
+                        if transpose:
+                            x, y = y, x
+                        perm.append(y * size + x)
+                    perms.append(perm)
+        _symmetry_cache[size] = perms
+    return _symmetry_cache[size]
+
+
+def _map_grid(values, perm):
+    """Moves every entry of a flat size x size list to its transformed index"""
+    result = [None] * len(values)
+    for i, value in enumerate(values):
+        result[perm[i]] = value
+    return result
+
+
+def _map_point(point, perm, size):
+    if point is None:
+        return None
+    x, y = point
+    j = perm[y * size + x]
+    return (j % size, j // size)
+
+
+def _map_score(value, perm, size):
+    score, position_scored = value
+    return (score, _map_grid(position_scored, perm))
+
+
+def _map_ownership(value, perm, size):
+    return _map_grid(value, perm)
+
+
+def _map_move(value, perm, size):
+    point, evaluation = value
+    return (_map_point(point, perm, size), evaluation)
+
+
+# cached value kinds: name -> (function mapping the value through a symmetry,
+#                              whether the value depends on the player to move and the ko)
+KINDS = {
+    'score': (_map_score, False),
+    # playouts start with the player to move and respect the ko
+    'ownership': (_map_ownership, True),
+    'move': (_map_move, True),
+}
+
+
+def canonical_key(logic, uses_turn=True):
+    """Computes the symmetry independent key of a position.
+
+    Arguments:
+        logic (GameLogic): the game
+        uses_turn (bool): include the player to move & the ko-blocked field
+
+    Returns:
+        (bytes, list): the 16 byte key and the permutation that maps the
+                       position onto its canonical orientation
+    """
+    size = logic.size
+    fields = bytearray(size * size)
+    for y, row in enumerate(logic.board):
+        for x, grp in enumerate(row):
+            if grp is not None:
+                fields[y * size + x] = _BLACK if grp.color else _WHITE
+    if uses_turn and logic.blocked_field is not None:
+        x, y = logic.blocked_field
+        fields[y * size + x] = _BLOCKED
+
+    best, best_perm = None, None
+    for perm in symmetries(size):
+        candidate = bytes(_map_grid(fields, perm))
+        if best is None or candidate < best:
+            best, best_perm = candidate, perm
+
+    header = bytes([size, (2 if logic.turn else 1) if uses_turn else 0])
+    return blake2b(header + best, digest_size=16).digest(), best_perm
+
+
+def inverse(perm):
+    """The permutation that undoes perm"""
+    result = [0] * len(perm)
+    for i, j in enumerate(perm):
+        result[j] = i
+    return result
+
+
+class PositionCache(object):
+    """Cache for analysis results (scores, ownership, best moves) that is shared
+    by all positions which are rotations or reflections of each other.
+
+    Values are stored in the canonical orientation and mapped back onto the
+    orientation of the requesting position. The in-memory tier is a LRU with
+    a size bound; the optional on-disk tier is a sqlite file.
+    Attributes:
+        maxsize (int): max. nr. of entries of the in-memory tier
+        hits, misses, disk_hits, evictions (int): lookup statistics
+    """
+
+    def __init__(self, maxsize=10000, path=None, commit_every=64):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self.evictions = 0
+        self.lookup_time = 0.0
+        self.lookups = 0
+
+        self._lock = threading.Lock()
+        self._db = None
+        self._pending = 0
+        self._commit_every = commit_every
+        if path is not None:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute('CREATE TABLE IF NOT EXISTS cache '
+                             '(key BLOB, kind TEXT, value TEXT, PRIMARY KEY (key, kind))')
+            self._db.commit()
+
+    def _lookup(self, logic, kind):
+        """Returns (key, perm, canonical value or None) and records the stats"""
+        start = time.perf_counter()
+        key, perm = canonical_key(logic, KINDS[kind][1])
+        value = self._get((key, kind))
+        with self._lock:
+            self.lookup_time += time.perf_counter() - start
+            self.lookups += 1
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return key, perm, value
+
+    def get(self, logic, kind):
+        """Returns the cached value of the given kind for the position, mapped
+        onto its orientation, or None"""
+        key, perm, value = self._lookup(logic, kind)
+        if value is None:
+            return None
+        return KINDS[kind][0](value, inverse(perm), logic.size)
+
+    def put(self, logic, kind, value):
+        """Stores a value of the given kind for the position"""
+        key, perm = canonical_key(logic, KINDS[kind][1])
+        self._put((key, kind), KINDS[kind][0](value, perm, logic.size))
+
+    def fetch(self, logic, kind, compute):
+        """Returns the cached value or computes it with compute() and caches it.
+        Used by score_game; the engine calls get and put itself, since it only
+        stores the results of searches and estimates that were not cancelled.
+        Playouts are not cached, their final positions hardly ever repeat."""
+        key, perm, value = self._lookup(logic, kind)
+        if value is not None:
+            return KINDS[kind][0](value, inverse(perm), logic.size)
+
+        value = compute()
+        self._put((key, kind), KINDS[kind][0](value, perm, logic.size))
+        return value
+
+    def _get(self, entry):
+        with self._lock:
+            if entry in self.entries:
+                self.entries.move_to_end(entry)
+                return self.entries[entry]
+            if self._db is None:
+                return None
+            row = self._db.execute('SELECT value FROM cache WHERE key = ? AND kind = ?',
+                                   entry).fetchone()
+        if row is None:
+            return None
+        value = _from_json(entry[1], json.loads(row[0]))
+        with self._lock:
+            self.disk_hits += 1
+            self._remember(entry, value)
+        return value
+
+    def _put(self, entry, value):
+        with self._lock:
+            self._remember(entry, value)
+            if self._db is not None:
+                self._db.execute('INSERT OR REPLACE INTO cache VALUES (?, ?, ?)',
+                                 (entry[0], entry[1], json.dumps(value)))
+                self._pending += 1
+                if self._pending >= self._commit_every:
+                    self._db.commit()
+                    self._pending = 0
+
+    def _remember(self, entry, value):
+        """Adds an entry to the LRU tier, the lock must be held"""
+        self.entries[entry] = value
+        self.entries.move_to_end(entry)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self):
+        """Returns the hit / miss ratios, eviction count and lookup latency"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size'          : len(self.entries),
+                'maxsize'       : self.maxsize,
+                'hits'          : self.hits,
+                'misses'        : self.misses,
+                'disk_hits'     : self.disk_hits,
+                'evictions'     : self.evictions,
+                'hit_ratio'     : self.hits / lookups if lookups else 0.0,
+                'miss_ratio'    : self.misses / lookups if lookups else 0.0,
+                'avg_lookup_us' : self.lookup_time / self.lookups * 1e6 if self.lookups else 0.0,
+            }
+
+    def disk_stats(self):
+        """Returns kind -> nr. of entries of the on-disk tier, empty without one"""
+        with self._lock:
+            if self._db is None:
+                return {}
+            return dict(self._db.execute('SELECT kind, COUNT(*) FROM cache GROUP BY kind').fetchall())
+
+    def print_stats(self):
+        """Prints the lookup statistics and the size of the disk tier"""
+        stats = self.stats()
+        print("position cache: {size}/{maxsize} entries, {hits} hits, {misses} misses "
+              "({hit_ratio:.1%} hit ratio), {disk_hits} from disk, {evictions} evictions, "
+              "{avg_lookup_us:.1f} us per lookup".format(**stats))
+        for kind, count in sorted(self.disk_stats().items()):
+            print("  on disk: {} {} entries".format(count, kind))
+
+    def clear(self):
+        """Empties the in-memory tier, the disk tier is kept"""
+        with self._lock:
+            self.entries.clear()
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.commit()
+                self._db.close()
+                self._db = None
+
+
+def _from_json(kind, value):
+    """Restores the tuples that json turned into lists"""
+    if kind == 'score':
+        return (value[0], value[1])
+    if kind == 'move':
+        point = tuple(value[0]) if value[0] is not None else None
+        return (point, value[1])
+    return value
+
+
+# the disk tier of the engine is only used when this file exists, create it
+# with "python position_cache.py --create"
+DEFAULT_PATH = 'position_cache.sqlite'
+
+_default_cache = PositionCache()
+
+
+def default_cache():
+    """The cache consulted by score_game, the playouts and the search.
+    None when caching is disabled."""
+    return _default_cache
+
+
+def set_default_cache(cache):
+    """Replaces the shared cache, e.g. with one backed by a file, or disables
+    caching when cache is None"""
+    global _default_cache
+    _default_cache = cache
+
+
+def open_default(maxsize=10000):
+    """A cache backed by DEFAULT_PATH if that file exists, in-memory otherwise.
+    Every entry is committed right away, the engine processes are stopped
+    without warning when the game closes."""
+    if not os.path.exists(DEFAULT_PATH):
+        return PositionCache(maxsize)
+    return PositionCache(maxsize, DEFAULT_PATH, commit_every=1)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Inspect the on-disk position cache')
+    parser.add_argument('path', nargs='?', default=DEFAULT_PATH)
+    parser.add_argument('--create', action='store_true', help='create the file if it does not exist')
+    args = parser.parse_args()
+    if not args.create and not os.path.exists(args.path):
+        parser.exit(1, "{} does not exist, use --create\n".format(args.path))
+    cache = PositionCache(path=args.path)
+    cache.print_stats()
+    cache.close()
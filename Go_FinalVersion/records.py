@@ -0,0 +1,230 @@
+"""Reading game records lazily, one game at a time.
+
+Supported are SGF files (also collections of several games) and the
+session journals written by the board (see journal.py).
+"""
+import re
+
+import journal
+
+
+class GameRecord(object):
+    """A finished game.
+    Attributes:
+        size (int): board size
+        moves (list): (x, y) for a stone, None for a pass
+        colors (list): color of every move, True = black
+        setup (list): (x, y, color) stones on the board before the first move (handicap)
+        winner (bool): True = black, False = white, None if unknown
+        source (str): file the game comes from
+    """
+
+    def __init__(self, size, moves, winner=None, source=None, colors=None, setup=None):
+        self.size = size
+        self.moves = moves
+        # without colors the players alternate, starting with black
+        self.colors = colors if colors is not None else [i % 2 == 0 for i in range(len(moves))]
+        self.setup = setup or []
+        self.winner = winner
+        self.source = source
+
+    def setup_board(self, game):
+        """Places the setup stones on a new GameLogic and gives the turn to the
+        player of the first move. Returns False if they can not be placed."""
+        for (x, y, color) in self.setup:
+            game.turn = color
+            if not self.on_board(x, y) or not game.place_stone(x, y):
+                return False
+        game.blocked_field = None
+        if self.colors:
+            game.turn = self.colors[0]
+        return True
+
+    def on_board(self, x, y):
+        return 0 <= x < self.size and 0 <= y < self.size
+
+    def play(self, game, i):
+        """Plays move i on the game with the color of the record, also when the
+        same player moves twice. Returns False if the move is illegal or off
+        the board."""
+        game.turn = self.colors[i]
+        if self.moves[i] is None:
+            game.passing()
+            return True
+        if not self.on_board(*self.moves[i]):
+            return False
+        return game.place_stone(*self.moves[i])
+
+
+# a complete value, an opening bracket whose value continues in the next
+# block, or a piece of syntax; everything else (white space, lower case
+# letters of old FF3 property names) is skipped
+_TOKEN = re.compile(r'\[((?:[^\]\\]|\\.)*)\]|(\[)|([();])|([A-Z]+)', re.DOTALL)
+_ESCAPE = re.compile(r'\\(.)', re.DOTALL)
+
+
+def _tokens(chunks):
+    """Splits a stream of SGF text into '(', ')', ';' and (name, [values]).
+    Values are read as a whole, so they may contain any character (comments)."""
+    name, values = '', []
+    rest = ''
+    for chunk in chunks:
+        text = rest + chunk
+        rest = ''
+        for m in _TOKEN.finditer(text):
+            value, unfinished, syntax, letters = m.groups()
+            if value is not None:
+                values.append(_ESCAPE.sub(r'\1', value) if '\\' in value else value)
+            elif unfinished is not None:
+                rest = text[m.start():]
+                break
+            elif syntax is not None:
+                if name:
+                    yield name, values
+                    name, values = '', []
+                yield syntax
+            else:
+                if values:
+                    yield name, values
+                    name, values = '', []
+                name += letters
+    if name:
+        yield name, values
+
+
+def _sgf_point(value, size):
+    """'dd' -> (3, 3), '' or 'tt' (on boards up to 19x19) -> None (pass).
+    Raises ValueError if the value is not a point."""
+    if value == '' or (value == 'tt' and size <= 19):
+        return None
+    if len(value) != 2 or not value.isalpha():
+        raise ValueError('not an SGF point: {!r}'.format(value))
+    return (ord(value[0]) - ord('a'), ord(value[1]) - ord('a'))
+
+
+def _sgf_points(value):
+    """'dd' -> [(3, 3)], the compressed rectangle 'aa:bb' -> all its points"""
+    first, _, last = value.partition(':')
+    (x0, y0), (x1, y1) = _sgf_point(first, 0), _sgf_point(last or first, 0)
+    return [(x, y) for y in range(min(y0, y1), max(y0, y1) + 1)
+            for x in range(min(x0, x1), max(x0, x1) + 1)]
+
+
+class _GameBuilder(object):
+    """Collects the properties of the main line of one game"""
+
+    def __init__(self):
+        self.size, self.winner = 19, None
+        self.moves, self.colors, self.setup = [], [], []
+        self.valid = True
+
+    def add(self, name, values):
+        """Adds a property, a malformed value makes the game invalid"""
+        try:
+            self._add(name, values)
+        except ValueError:
+            self.valid = False
+
+    def _add(self, name, values):
+        if not values:
+            return
+        value = values[0]
+        if name == 'SZ':
+            self.size = int(value.split(':')[0])
+        elif name == 'RE':
+            if value.upper().startswith('B+'):
+                self.winner = True
+            elif value.upper().startswith('W+'):
+                self.winner = False
+        elif name in ('B', 'W'):
+            self.moves.append(_sgf_point(value, self.size))
+            self.colors.append(name == 'B')
+        elif name in ('AB', 'AW', 'AE'):
+            if self.moves:
+                # stones added or removed during the game can not be replayed
+                self.valid = False
+                return
+            points = set(p for v in values for p in _sgf_points(v))
+            self.setup = [s for s in self.setup if (s[0], s[1]) not in points]
+            if name != 'AE':
+                self.setup.extend((x, y, name == 'AB') for (x, y) in sorted(points))
+
+    def record(self, source):
+        if not self.valid or not self.moves:
+            return None
+        return GameRecord(self.size, self.moves, self.winner, source, self.colors, self.setup)
+
+
+def _parse(chunks, source):
+    """Yields a GameRecord for every game of a stream of SGF text. Only the
+    main line is kept: the first variation wherever the game branches."""
+    # one entry per open '(': [nr. of variations opened in it, on the main line]
+    stack = []
+    game = None
+    for token in _tokens(chunks):
+        if token == '(':
+            if stack:
+                parent = stack[-1]
+                parent[0] += 1
+                stack.append([0, parent[1] and parent[0] == 1])
+            else:
+                game = _GameBuilder()
+                stack.append([0, True])
+        elif token == ')':
+            if not stack:
+                continue
+            stack.pop()
+            if not stack:
+                record = game.record(source)
+                if record is not None:
+                    yield record
+        elif token != ';' and stack and stack[-1][1]:
+            game.add(*token)
+
+
+def parse_sgf(text, source=None):
+    """Yields a GameRecord for every game (main line only) in an SGF text"""
+    return _parse([text], source)
+
+
+def read_sgf(path, block_size=1 << 16):
+    """Yields the games of an SGF file. The file is read in blocks and every
+    game is handed out when it is complete, so large collections are never
+    in memory as a whole."""
+    with open(path, encoding='utf-8', errors='replace') as f:
+        for record in _parse(iter(lambda: f.read(block_size), ''), path):
+            yield record
+
+
+def read_journal(path):
+    """Yields the games of a session journal, a game ends with a reset.
+    Journals with many games at once keep the games apart by their index."""
+    games = {}  # game index (None on the board) -> (size, moves)
+    for event in journal.read(path):
+        index = event.get('game')
+        if event['type'] == 'start':
+            games[index] = (event['size'], [])
+        elif index not in games:
+            continue
+        elif event['type'] == 'move':
+            games[index][1].append((event['x'], event['y']))
+        elif event['type'] == 'pass':
+            games[index][1].append(None)
+        elif event['type'] == 'rewind':
+            # the game continued from an earlier position
+            del games[index][1][event['moves']:]
+        elif event['type'] in ('reset', 'end'):
+            size, moves = games.pop(index)
+            if moves:
+                yield GameRecord(size, moves, None, path)
+
+
+def iter_games(paths):
+    """Yields the games of all files, one file at a time"""
+    for path in paths:
+        if path.lower().endswith('.sgf'):
+            for record in read_sgf(path):
+                yield record
+        else:
+            for record in read_journal(path):
+                yield record
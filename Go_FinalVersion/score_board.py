@@ -70,17 +70,41 @@ class ScoreBoard(QDockWidget):
         self.white_time_remaining.setStyleSheet("margin: 0px; padding:2px; ")
         self.white_time_remaining.setFont(QFont('Arial', 10))
 
+        self.engine_move = QPushButton("Engine Move", self)
+        self.engine_move.setFont(QFont('Arial', 10))
+        self.engine_move.setStyleSheet("margin: 0px; padding:5px;")
+        self.engine_move.clicked.connect(self.play_engine_move)
+
+        self.ownership = QPushButton("Show Territory", self)
+        self.ownership.setFont(QFont('Arial', 10))
+        self.ownership.setStyleSheet("margin: 0px; padding:5px;")
+        self.ownership.setCheckable(True)
+        self.ownership.toggled.connect(self.show_ownership)
+
+        # results of the background analysis
+        self.suggestion = QLabel("Suggested Move: ")
+        self.suggestion.setStyleSheet("margin: 0px; padding:2px; ")
+        self.suggestion.setFont(QFont('Arial', 10))
+
+        self.result = QLabel("Result: ")
+        self.result.setStyleSheet("margin: 0px; padding:2px; ")
+        self.result.setFont(QFont('Arial', 10))
+
         # adding to the layout
         self.main_layout.setAlignment(QtCore.Qt.AlignCenter)
         self.main_layout.addWidget(self.start, alignment=QtCore.Qt.AlignLeft)
         self.main_layout.addWidget(self.start_speed_go, alignment=QtCore.Qt.AlignLeft)
         self.main_layout.addWidget(self.reset, alignment=QtCore.Qt.AlignLeft)
         self.main_layout.addWidget(self.pass_turn, alignment=QtCore.Qt.AlignLeft)
+        self.main_layout.addWidget(self.engine_move, alignment=QtCore.Qt.AlignLeft)
+        self.main_layout.addWidget(self.ownership, alignment=QtCore.Qt.AlignLeft)
         self.main_layout.addWidget(self.player, alignment=QtCore.Qt.AlignLeft)
         self.main_layout.addWidget(self.label_click_location, alignment=QtCore.Qt.AlignLeft)
         self.main_layout.addWidget(self.label_time_remaining, alignment=QtCore.Qt.AlignLeft)
         self.main_layout.addWidget(self.black_time_remaining, alignment=QtCore.Qt.AlignLeft)
         self.main_layout.addWidget(self.white_time_remaining, alignment=QtCore.Qt.AlignLeft)
+        self.main_layout.addWidget(self.suggestion, alignment=QtCore.Qt.AlignLeft)
+        self.main_layout.addWidget(self.result, alignment=QtCore.Qt.AlignLeft)
         self.main_widget.setLayout(self.main_layout)
         self.setWidget(self.main_widget)
         self.show()
@@ -96,6 +120,10 @@ class ScoreBoard(QDockWidget):
         board.white_timer_signal.connect(self.update_white)
         board.black_timer_signal.connect(self.update_black)
 
+        board.suggestion_signal.connect(self.set_suggestion)
+        board.score_signal.connect(self.set_result)
+        board.engine_pass_signal.connect(self.pass_a_turn)
+
     @pyqtSlot(str)  # checks to make sure that the following slot is receiving an argument of the type 'int'
     def set_click_location(self, click_loc):
         """updates the label to show the click location"""
@@ -110,6 +138,16 @@ class ScoreBoard(QDockWidget):
         # print('slot ' + update)
         # self.redraw()
 
+    @pyqtSlot(str)
+    def set_suggestion(self, text):
+        """updates the label with the best move found by the background analysis"""
+        self.suggestion.setText("Suggested Move: " + text)
+
+    @pyqtSlot(str)
+    def set_result(self, text):
+        """updates the label with the score of the last game"""
+        self.result.setText("Result: " + text)
+
     @pyqtSlot(bool)
     def player_turn(self, turn):
         current_text = "Game Over"
@@ -153,6 +191,19 @@ class ScoreBoard(QDockWidget):
     def start_game(self):
         __main__.myGo.get_board().start()
 
+    def resume_game(self, speed_go):
+        """updates the labels for a game that was recovered from the journal"""
+        self.speed_go = speed_go
+        if speed_go:
+            self.black_time_remaining.setText("Player Blacks Time remaining: ")
+            self.white_time_remaining.setText("Player Whites Time remaining: ")
+
+    def play_engine_move(self):
+        __main__.myGo.get_board().engine_move()
+
+    def show_ownership(self, checked):
+        __main__.myGo.get_board().set_show_ownership(checked)
+
     def start_speed_game(self):
         self.speed_go = True
         self.black_time_remaining.setText("Player Blacks Time remaining: ")
@@ -192,5 +243,6 @@ class ScoreBoard(QDockWidget):
         self.label_time_remaining.setText("Time Taken: ")
         self.black_time_remaining.setText("")
         self.white_time_remaining.setText("")
+        self.suggestion.setText("Suggested Move: ")
         self.white_pass = 0
         self.black_pass = 0
@@ -0,0 +1,191 @@
+import random
+import sys
+
+from PyQt5.QtWidgets import QApplication, QWidget, QGridLayout
+from PyQt5.QtCore import Qt, QTimer, QRect
+from PyQt5.QtGui import QPainter, QPixmap, QColor
+
+from game_logic import GameLogic
+from engine import play_weighted
+
+
+class GameSource(object):
+    """Plays many games headless and hands out the changes of each move.
+
+    Every call of poll() plays one move in every game with the pattern
+    weighted playout policy and returns only what changed. Finished games
+    are restarted. Engine processes can feed the spectator the same way.
+
+    With a journal every game is logged like a game on the board (start,
+    move, pass, reset), each event carries the index of its game.
+    """
+
+    def __init__(self, games=64, size=9, seed=None, journal=None):
+        self.size = size
+        self.journal = journal  # optional journal.Journal logging every move
+        self.rng = random.Random(seed)
+        self.games = [self._new_game(i) for i in range(games)]
+        self.moves = [0] * games
+
+    def _log(self, kind, i, **fields):
+        if self.journal is not None:
+            self.journal.append(kind, game=i, **fields)
+
+    def _new_game(self, i):
+        self._log('start', i, size=self.size)
+        return GameLogic(self.size, patterns=True)
+
+    def _move(self, i, game):
+        move = play_weighted(game, self.rng)
+        if move is None:
+            game.passing()
+            self._log('pass', i)
+            return []
+        x, y = move
+        self._log('move', i, x=x, y=y)
+        return [(x, y, game.board[y][x].color)] + [(u, v, None) for (u, v) in game.last_changes[1:]]
+
+    def poll(self):
+        """Plays one move in every game.
+
+        Returns:
+            (list): (game index, changes, restarted) for every game that
+                    changed, changes is a list of (x, y, color or None)
+        """
+        diffs = []
+        for i, game in enumerate(self.games):
+            if game.game_over or self.moves[i] >= 3 * self.size * self.size:
+                self._log('reset', i)
+                self.games[i] = self._new_game(i)
+                self.moves[i] = 0
+                diffs.append((i, [], True))
+                continue
+            self.moves[i] += 1
+            changes = self._move(i, game)
+            if changes:
+                diffs.append((i, changes, False))
+        return diffs
+
+
+class SharedPixmaps(object):
+    """Board and stone pixmaps shared by all small boards of the same size,
+    drawn once instead of per board and per paint"""
+    _cache = {}
+
+    @classmethod
+    def get(cls, size, cell):
+        key = (size, cell)
+        if key not in cls._cache:
+            cls._cache[key] = cls(size, cell)
+        return cls._cache[key]
+
+    def __init__(self, size, cell):
+        self.cell = cell
+        self.board = QPixmap(size * cell, size * cell)
+        self.board.fill(QColor("#FCF3CF"))
+        painter = QPainter(self.board)
+        painter.setPen(QColor("#7F8C8D"))
+        for i in range(size):
+            c = i * cell + cell // 2
+            painter.drawLine(cell // 2, c, size * cell - cell // 2, c)
+            painter.drawLine(c, cell // 2, c, size * cell - cell // 2)
+        painter.end()
+
+        self.stones = {}
+        for color, fill in [(True, Qt.black), (False, Qt.white)]:
+            stone = QPixmap(cell, cell)
+            stone.fill(Qt.transparent)
+            painter = QPainter(stone)
+            painter.setRenderHint(QPainter.Antialiasing)
+            painter.setBrush(fill)
+            painter.setPen(Qt.black)
+            painter.drawEllipse(1, 1, cell - 2, cell - 2)
+            painter.end()
+            self.stones[color] = stone
+
+
+class MiniBoard(QWidget):
+    """A small board that keeps its own picture and only redraws the fields
+    that changed"""
+
+    def __init__(self, size, cell, parent=None):
+        super().__init__(parent)
+        self.size = size
+        self.shared = SharedPixmaps.get(size, cell)
+        self.setFixedSize(size * cell, size * cell)
+        self.clear()
+
+    def clear(self):
+        self.picture = QPixmap(self.shared.board)
+        self.dirty = True
+
+    def apply(self, changes):
+        """Draws the changed fields into the picture, the widget is repainted
+        by the next flush of the grid"""
+        cell = self.shared.cell
+        painter = QPainter(self.picture)
+        for (x, y, color) in changes:
+            rect = QRect(x * cell, y * cell, cell, cell)
+            # restore the empty field first, then put the stone on it
+            painter.drawPixmap(rect, self.shared.board, rect)
+            if color is not None:
+                painter.drawPixmap(rect.topLeft(), self.shared.stones[color])
+        painter.end()
+        self.dirty = True
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.drawPixmap(event.rect(), self.picture, event.rect())
+
+
+class SpectatorGrid(QWidget):
+    """Grid of small boards showing the games of a GameSource.
+
+    Changes are drawn into the boards as they arrive, but the widgets are
+    repainted at most max_fps times per second and only when they changed.
+    """
+
+    def __init__(self, source, columns=8, cell=10, moves_per_second=20, max_fps=10, parent=None):
+        super().__init__(parent)
+        self.source = source
+        self.setWindowTitle('Go - {} games'.format(len(source.games)))
+
+        layout = QGridLayout()
+        layout.setSpacing(4)
+        self.boards = []
+        for i in range(len(source.games)):
+            board = MiniBoard(source.size, cell, self)
+            layout.addWidget(board, i // columns, i % columns)
+            self.boards.append(board)
+        self.setLayout(layout)
+
+        self.poll_timer = QTimer(self)
+        self.poll_timer.timeout.connect(self.poll)
+        self.poll_timer.start(1000 // moves_per_second)
+
+        self.flush_timer = QTimer(self)
+        self.flush_timer.timeout.connect(self.flush)
+        self.flush_timer.start(1000 // max_fps)
+
+    def poll(self):
+        """Takes the new moves from the source"""
+        for i, changes, restarted in self.source.poll():
+            if restarted:
+                self.boards[i].clear()
+            else:
+                self.boards[i].apply(changes)
+
+    def flush(self):
+        """Repaints the boards that changed since the last flush"""
+        for board in self.boards:
+            if board.dirty:
+                board.dirty = False
+                board.update()
+
+
+if __name__ == '__main__':
+    app = QApplication([])
+    games = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    grid = SpectatorGrid(GameSource(games))
+    grid.show()
+    sys.exit(app.exec_())
@@ -0,0 +1,309 @@
+import time
+
+# field values of the reader's board
+EMPTY, BLACK_STONE, WHITE_STONE, EDGE = 0, 1, 2, 3
+
+# sentinel returned while reading when a group has already escaped
+ESCAPED = -1
+
+
+class ReadingLimit(Exception):
+    """Raised when a read needs more nodes or a greater depth than allowed,
+    the result is unknown"""
+
+
+class TacticalReader(object):
+    """Reads ladders and simple capture races with the game rules (captures,
+    suicide, simple ko) on a compact board.
+
+    The board is a flat list with a border of EDGE fields, so neighbours are
+    index offsets and need no bounds checks. Moves are made and unmade in
+    place; liberties are counted by a flood fill that stops as soon as the
+    wanted nr. of liberties has been found.
+    Attributes:
+        size (int): board size
+        nodes (int): nr. of moves made by the last read
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.stride = size + 2
+        self.cells = [EDGE] * (self.stride * self.stride)
+        for y in range(size):
+            for x in range(size):
+                self.cells[self.point(x, y)] = EMPTY
+        self.offsets = (-1, 1, -self.stride, self.stride)
+        self.ko = None
+        self.history = []
+        self.nodes = 0
+        self.node_limit = None
+        # marks used by the flood fills instead of allocating sets
+        self._mark = [0] * len(self.cells)
+        self._stamp = 0
+
+    @classmethod
+    def from_game(cls, game):
+        """Copies the position of a GameLogic"""
+        reader = cls(game.size)
+        for y, row in enumerate(game.board):
+            for x, grp in enumerate(row):
+                if grp is not None:
+                    reader.cells[reader.point(x, y)] = BLACK_STONE if grp.color else WHITE_STONE
+        if game.blocked_field is not None:
+            reader.ko = reader.point(*game.blocked_field)
+        return reader
+
+    def point(self, x, y):
+        return (y + 1) * self.stride + x + 1
+
+    def coordinates(self, p):
+        y, x = divmod(p, self.stride)
+        return (x - 1, y - 1)
+
+    def liberties(self, p, limit=4):
+        """Returns up to limit liberties of the group at p"""
+        self._stamp += 1
+        stamp, mark, cells = self._stamp, self._mark, self.cells
+        color = cells[p]
+        libs = []
+        stack = [p]
+        mark[p] = stamp
+        while stack:
+            q = stack.pop()
+            for d in self.offsets:
+                n = q + d
+                if mark[n] == stamp:
+                    continue
+                c = cells[n]
+                if c == EMPTY:
+                    mark[n] = stamp
+                    libs.append(n)
+                    if len(libs) >= limit:
+                        return libs
+                elif c == color:
+                    mark[n] = stamp
+                    stack.append(n)
+        return libs
+
+    def stones(self, p):
+        """Returns all stones of the group at p"""
+        self._stamp += 1
+        stamp, mark, cells = self._stamp, self._mark, self.cells
+        color = cells[p]
+        group = [p]
+        mark[p] = stamp
+        i = 0
+        while i < len(group):
+            q = group[i]
+            i += 1
+            for d in self.offsets:
+                n = q + d
+                if mark[n] != stamp and cells[n] == color:
+                    mark[n] = stamp
+                    group.append(n)
+        return group
+
+    def play(self, p, color):
+        """Makes a move in place. Returns False (and changes nothing) if the
+        move is illegal"""
+        cells = self.cells
+        if cells[p] != EMPTY or p == self.ko:
+            return False
+        if self.node_limit is not None and self.nodes >= self.node_limit:
+            raise ReadingLimit()
+        self.nodes += 1
+
+        other = WHITE_STONE if color == BLACK_STONE else BLACK_STONE
+        cells[p] = color
+        captured = []
+        for d in self.offsets:
+            n = p + d
+            if cells[n] == other and not self.liberties(n, 1):
+                group = self.stones(n)
+                for q in group:
+                    cells[q] = EMPTY
+                captured.extend(group)
+
+        if not captured and not self.liberties(p, 1):
+            cells[p] = EMPTY  # suicide
+            return False
+
+        self.history.append((p, captured, self.ko))
+        # ko-rule as in GameLogic: a single stone captured a single stone
+        if len(captured) == 1 and len(self.stones(p)) == 1:
+            self.ko = captured[0]
+        else:
+            self.ko = None
+        return True
+
+    def undo(self):
+        """Takes back the last move made by play"""
+        p, captured, ko = self.history.pop()
+        other = WHITE_STONE if self.cells[p] == BLACK_STONE else BLACK_STONE
+        self.cells[p] = EMPTY
+        for q in captured:
+            self.cells[q] = other
+        self.ko = ko
+
+    def _capture(self, p, depth):
+        """Attacker to move. Returns the move that captures the group at p
+        (or puts it into a ladder that works), None if it can not be captured"""
+        libs = self.liberties(p, 3)
+        defender = self.cells[p]
+        attacker = WHITE_STONE if defender == BLACK_STONE else BLACK_STONE
+        if len(libs) == 1:
+            if not self.play(libs[0], attacker):
+                return None
+            self.undo()
+            return libs[0]
+        if len(libs) >= 3:
+            return None
+        if depth <= 0:
+            raise ReadingLimit()
+        for lib in libs:
+            if not self.play(lib, attacker):
+                continue
+            escape = self._escape(p, depth - 1)
+            self.undo()
+            if escape is None:
+                return lib
+        return None
+
+    def _escape(self, p, depth):
+        """Defender to move, the group at p is in atari. Returns a move that
+        saves it, ESCAPED if it has enough liberties already, None if it is lost"""
+        libs = self.liberties(p, 2)
+        if len(libs) >= 2:
+            return ESCAPED
+        if depth <= 0:
+            raise ReadingLimit()
+        defender = self.cells[p]
+        attacker = WHITE_STONE if defender == BLACK_STONE else BLACK_STONE
+
+        # capture an attacking group that is in atari itself, or extend
+        moves = []
+        checked = set()
+        for q in self.stones(p):
+            for d in self.offsets:
+                n = q + d
+                if self.cells[n] == attacker and n not in checked:
+                    checked.add(n)
+                    attacker_libs = self.liberties(n, 2)
+                    if len(attacker_libs) == 1 and attacker_libs[0] not in moves:
+                        moves.append(attacker_libs[0])
+        moves.extend(libs)
+
+        for move in moves:
+            if not self.play(move, defender):
+                continue
+            new_libs = len(self.liberties(p, 3))
+            if new_libs >= 3:
+                saved = True
+            elif new_libs <= 1:
+                saved = False
+            else:
+                saved = self._capture(p, depth - 1) is None
+            self.undo()
+            if saved:
+                return move
+        return None
+
+    def _read(self, function, x, y, depth, node_limit):
+        p = self.point(x, y)
+        if self.cells[p] not in (BLACK_STONE, WHITE_STONE):
+            raise ValueError('There is no stone at ({}, {})'.format(x, y))
+        self.nodes = 0
+        self.node_limit = node_limit
+        played = len(self.history)
+        try:
+            return function(p, depth)
+        except ReadingLimit:
+            # unmake the moves of the read, the result is unknown
+            while len(self.history) > played:
+                self.undo()
+            raise
+
+    def capture_move(self, x, y, depth=100, node_limit=10000):
+        """Returns the (x, y) that captures the group at (x, y) when its
+        opponent is to move, or None.
+
+        Raises:
+            ReadingLimit: more than node_limit moves or depth moves deep would be needed
+        """
+        move = self._read(self._capture, x, y, depth, node_limit)
+        return None if move is None else self.coordinates(move)
+
+    def escape_move(self, x, y, depth=100, node_limit=10000):
+        """Returns the (x, y) that saves the group at (x, y) from capture when
+        it is to move, (x, y) is not in danger (ESCAPED), or None if the group
+        is lost.
+
+        Raises:
+            ReadingLimit: more than node_limit moves or depth moves deep would be needed
+        """
+        move = self._read(self._escape, x, y, depth, node_limit)
+        return move if move is None or move == ESCAPED else self.coordinates(move)
+
+    def can_capture(self, x, y, **limits):
+        return self.capture_move(x, y, **limits) is not None
+
+    def can_escape(self, x, y, **limits):
+        return self.escape_move(x, y, **limits) is not None
+
+
+def tactical_moves(game, node_limit=2000):
+    """Moves that capture opponent groups with at most 2 liberties (ladders
+    included) and moves that save own groups in atari, for the player to move.
+    Reads that hit the node or depth limit are skipped."""
+    reader = TacticalReader.from_game(game)
+    own = BLACK_STONE if game.turn else WHITE_STONE
+    moves = []
+    seen = set()
+    for y, row in enumerate(game.board):
+        for x, grp in enumerate(row):
+            if grp is None or id(grp) in seen:
+                continue
+            seen.add(id(grp))
+            if game._liberties(grp) > 2:
+                continue
+            try:
+                if reader.cells[reader.point(x, y)] == own:
+                    if game._liberties(grp) == 1:
+                        move = reader.escape_move(x, y, node_limit=node_limit)
+                    else:
+                        move = None
+                else:
+                    move = reader.capture_move(x, y, node_limit=node_limit)
+            except ReadingLimit:
+                continue
+            if move is not None and move != ESCAPED and move not in moves:
+                moves.append(move)
+    return moves
+
+
+def benchmark(repeat=200):
+    """Reads a ladder that runs across a 19x19 board, once with and once
+    without a ladder breaker, and reports nodes/sec"""
+    for breaker in (False, True):
+        reader = TacticalReader(19)
+        # white stone at (15, 3) in a ladder that runs to the lower left, black to move
+        for (x, y) in [(14, 3), (15, 2), (16, 4)]:
+            reader.cells[reader.point(x, y)] = BLACK_STONE
+        reader.cells[reader.point(15, 3)] = WHITE_STONE
+        if breaker:
+            # one white stone on the path of each of the two possible ladders
+            reader.cells[reader.point(7, 11)] = WHITE_STONE
+            reader.cells[reader.point(17, 2)] = WHITE_STONE
+
+        start = time.perf_counter()
+        nodes = 0
+        for _ in range(repeat):
+            result = reader.can_capture(15, 3)
+            nodes += reader.nodes
+        elapsed = time.perf_counter() - start
+        print("ladder {} breaker: captured={}, {} nodes, {:.0f} us per read, {:.0f} nodes/s".format(
+            "with" if breaker else "without", result, reader.nodes, elapsed / repeat * 1e6, nodes / elapsed))
+
+
+if __name__ == '__main__':
+    benchmark()
@@ -0,0 +1,30 @@
+import pytest
+
+pytest.importorskip('PyQt5.QtCore')
+
+from game_logic import GameLogic
+import fuzz
+
+
+class Crashing(GameLogic):
+    """Raises on the first stone placed on the center of the board"""
+
+    def place_stone(self, x, y):
+        if (x, y) == (self.size // 2, self.size // 2):
+            raise IndexError('broken')
+        return super().place_stone(x, y)
+
+
+def test_exception_is_a_divergence():
+    moves = [(0, 0), (1, 1), None, (4, 4), (2, 2)]
+    step, expected, actual = fuzz.compare(GameLogic, Crashing, 9, moves)
+    assert step == 3
+    assert actual == ('raised', 'IndexError', 'broken')
+    assert fuzz.minimize(GameLogic, Crashing, 9, moves) == [(4, 4)]
+
+
+def test_moves_count_stops_at_divergence():
+    result = fuzz.run_chunk(('test_fuzz:Crashing', 'random', 0, 50, 9, 120))
+    kind, seed, reproducer, details = result['divergence']
+    assert reproducer == [(4, 4)]
+    assert result['moves'] < result['sequences'] * 120
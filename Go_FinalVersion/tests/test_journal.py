@@ -0,0 +1,66 @@
+import journal
+
+
+def write_session(path, moves):
+    log = journal.Journal(str(path))
+    log.append('start', size=9, speed_go=False)
+    for x, y in moves:
+        log.append('move', x=x, y=y)
+    log.close()
+
+
+def test_read_back(tmp_path):
+    path = tmp_path / 'session.journal'
+    write_session(path, [(2, 3), (4, 5)])
+    events = list(journal.read(str(path)))
+    assert [e['type'] for e in events] == ['start', 'move', 'move']
+    assert (events[2]['x'], events[2]['y']) == (4, 5)
+
+
+def test_torn_tail_then_append(tmp_path):
+    path = tmp_path / 'session.journal'
+    write_session(path, [(0, 0)])
+    # crash in the middle of writing the next line
+    with open(str(path), 'ab') as f:
+        f.write(b'1234abcd\t{"type":"mo')
+
+    write_session(path, [(2, 3), (4, 5)])
+
+    session = journal.unfinished_session(str(path))
+    assert [e['type'] for e in session] == ['start', 'move', 'move']
+    assert [(e['x'], e['y']) for e in session[1:]] == [(2, 3), (4, 5)]
+
+
+def test_damaged_line_is_skipped(tmp_path):
+    path = tmp_path / 'session.journal'
+    write_session(path, [(0, 0)])
+    with open(str(path), 'ab') as f:
+        f.write(b'00000000\t{"type":"move","x":1,"y":1}\n')
+    log = journal.Journal(str(path))
+    log.append('move', x=7, y=7)
+    log.close()
+
+    session = journal.unfinished_session(str(path))
+    assert [(e['x'], e['y']) for e in session[1:]] == [(0, 0), (7, 7)]
+
+
+def test_repair_without_newline(tmp_path):
+    path = tmp_path / 'session.journal'
+    path.write_bytes(b'torn')
+    assert journal.repair(str(path)) == 4
+    assert path.read_bytes() == b''
+
+
+def test_games_are_kept_apart(tmp_path):
+    path = tmp_path / 'headless.journal'
+    log = journal.Journal(str(path))
+    log.append('start', game=0, size=9)
+    log.append('start', game=1, size=9)
+    log.append('move', game=0, x=1, y=1)
+    log.append('move', game=1, x=2, y=2)
+    log.append('move', game=0, x=3, y=3)
+    log.close()
+
+    session = journal.unfinished_session(str(path), game=0)
+    assert [(e['x'], e['y']) for e in session[1:]] == [(1, 1), (3, 3)]
+    assert journal.unfinished_session(str(path)) is None
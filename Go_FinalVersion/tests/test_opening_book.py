@@ -0,0 +1,20 @@
+import pytest
+
+pytest.importorskip('PyQt5.QtCore')
+
+from game_logic import GameLogic
+import opening_book
+
+
+def test_off_board_move_ends_the_record(tmp_path):
+    sgf = tmp_path / 'games.sgf'
+    sgf.write_text('(;SZ[9]RE[B+1];B[cc];W[ja];B[dd])')
+    path = str(tmp_path / 'book.bin')
+    # only the first move is legal, W[ja] is off the 9x9 board
+    assert opening_book.build([str(sgf)], path) == 1
+    book = opening_book.OpeningBook(path)
+    try:
+        moves = book.lookup(GameLogic(9))
+        assert [(move, count) for move, count, winrate in moves] == [((2, 2), 1)]
+    finally:
+        book.close()
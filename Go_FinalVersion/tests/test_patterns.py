@@ -0,0 +1,73 @@
+import random
+
+import pytest
+
+pytest.importorskip('PyQt5.QtCore')
+
+from game_logic import GameLogic
+from patterns import PatternBoard
+
+
+def random_game(size, moves, seed):
+    """Yields the game after every legal random move"""
+    rng = random.Random(seed)
+    game = GameLogic(size, patterns=True)
+    for _ in range(moves):
+        x, y = rng.randrange(size), rng.randrange(size)
+        if game.place_stone(x, y):
+            yield game
+
+
+def test_patterns_are_opt_in():
+    assert GameLogic(9).patterns is None
+    assert GameLogic(9, patterns=True).patterns is not None
+
+
+@pytest.mark.parametrize('size', [5, 9, 19])
+def test_incremental_update_equals_rebuild(size):
+    for game in random_game(size, 4 * size * size, seed=size):
+        full = PatternBoard(game, game.patterns.table)
+        assert game.patterns.codes == full.codes
+
+
+def test_weight_sums_equal_rebuild():
+    for i, game in enumerate(random_game(9, 300, seed=1)):
+        if i % 10:
+            continue
+        full = PatternBoard(game, game.patterns.table)
+        assert game.patterns.units == full.units
+        assert game.patterns.trees == full.trees
+        assert game.patterns.totals == [sum(full.units[0]), sum(full.units[1])]
+        copy = game.copy()
+        assert copy.patterns.trees == game.patterns.trees
+
+
+def test_sampling_follows_the_weights():
+    game = GameLogic(5, patterns=True)
+    for move in [(1, 1), (3, 3), (2, 2), (1, 2)]:
+        game.place_stone(*move)
+    patterns = game.patterns
+    rng = random.Random(0)
+    draws = 100000
+    counts = {}
+    for _ in range(draws):
+        move = patterns.sample(game.turn, rng)
+        counts[move] = counts.get(move, 0) + 1
+
+    weights = dict(patterns.candidates(game.turn))
+    assert set(counts) <= set(weights)  # never an occupied field or a 0 weight
+    total = sum(weights.values())
+    for move, weight in weights.items():
+        assert abs(counts.get(move, 0) / draws - weight / total) < 0.01
+
+
+def test_suppress_and_restore():
+    game = GameLogic(5, patterns=True)
+    patterns = game.patterns
+    totals = patterns.totals[:]
+    patterns.suppress(2, 2)
+    assert patterns.totals[0] < totals[0]
+    rng = random.Random(0)
+    assert all(patterns.sample(True, rng) != (2, 2) for _ in range(2000))
+    patterns.restore([(2, 2)])
+    assert patterns.totals == totals
@@ -0,0 +1,57 @@
+import pytest
+
+pytest.importorskip('PyQt5.QtCore')
+
+from game_logic import GameLogic
+import position_cache
+from position_cache import PositionCache, symmetries
+
+STONES = [(1, 0, True), (2, 3, True), (6, 1, True), (4, 4, False), (0, 7, False), (5, 6, False)]
+
+
+def position(perm, size=9):
+    """The test position transformed by a symmetry, white to move"""
+    game = GameLogic(size)
+    for x, y, color in STONES:
+        j = perm[y * size + x]
+        game.turn = color
+        assert game.place_stone(j % size, j // size)
+    game.turn = False
+    return game
+
+
+@pytest.fixture
+def no_default_cache():
+    previous = position_cache.default_cache()
+    position_cache.set_default_cache(None)
+    yield
+    position_cache.set_default_cache(previous)
+
+
+def test_symmetric_positions_share_the_entry(no_default_cache):
+    size = 9
+    identity = list(range(size * size))
+    original = position(identity)
+    ownership = [i / 100.0 for i in range(size * size)]
+
+    cache = PositionCache()
+    cache.put(original, 'score', original.score_game())
+    cache.put(original, 'ownership', ownership)
+    cache.put(original, 'move', ((7, 2), 0.6))
+
+    for perm in symmetries(size):
+        game = position(perm)
+        assert cache.get(game, 'score') == game.score_game()
+        mapped = cache.get(game, 'ownership')
+        assert [mapped[perm[i]] for i in range(size * size)] == ownership
+        j = perm[2 * size + 7]
+        assert cache.get(game, 'move') == ((j % size, j // size), 0.6)
+    assert cache.stats()['misses'] == 0
+
+
+def test_turn_is_part_of_the_move_key(no_default_cache):
+    cache = PositionCache()
+    game = position(list(range(81)))
+    cache.put(game, 'move', ((7, 2), 0.6))
+    game.turn = True
+    assert cache.get(game, 'move') is None
@@ -0,0 +1,80 @@
+import records
+
+
+def parse(text):
+    return list(records.parse_sgf(text))
+
+
+def test_moves_and_result():
+    game, = parse('(;GM[1]SZ[9]RE[W+3.5];B[cc];W[gg];B[];W[ee])')
+    assert game.size == 9
+    assert game.winner is False
+    assert game.moves == [(2, 2), (6, 6), None, (4, 4)]
+    assert game.colors == [True, False, True, False]
+
+
+def test_handicap_stones_and_colors():
+    game, = parse('(;SZ[9]HA[2]AB[cc][gg];W[ee];B[ce];B[ec])')
+    assert game.setup == [(2, 2, True), (6, 6, True)]
+    assert game.moves == [(4, 4), (2, 4), (4, 2)]
+    assert game.colors == [False, True, True]
+
+
+def test_compressed_setup_points():
+    game, = parse('(;SZ[9]AW[aa:bb]AB[cc];B[dd])')
+    assert sorted(game.setup) == [(0, 0, False), (0, 1, False), (1, 0, False), (1, 1, False), (2, 2, True)]
+
+
+def test_stones_added_during_the_game_are_rejected():
+    assert parse('(;SZ[9];B[aa];W[bb]AB[cc];B[dd])') == []
+
+
+def test_main_line_follows_first_variation():
+    game, = parse('(;SZ[9];B[aa];W[bb](;B[cc];W[dd](;B[ee])(;B[ff]))(;B[gg];W[hh]))')
+    assert game.moves == [(0, 0), (1, 1), (2, 2), (3, 3), (4, 4)]
+
+
+def test_brackets_in_comments():
+    game, = parse('(;SZ[9]C[hello; world (x) [a\\] b]];B[aa]C[;(];W[bb])')
+    assert game.moves == [(0, 0), (1, 1)]
+
+
+def test_collection():
+    games = parse('(;SZ[9];B[aa])\n(;SZ[13];B[bb];W[cc])')
+    assert [g.size for g in games] == [9, 13]
+    assert [len(g.moves) for g in games] == [1, 2]
+
+
+def test_escape_split_between_chunks():
+    text = '(;SZ[9]C[a\\]b];B[aa])'
+    for cut in range(len(text)):
+        game, = records._parse([text[:cut], text[cut:]], None)
+        assert game.moves == [(0, 0)]
+
+
+def test_read_sgf_in_small_blocks(tmp_path):
+    path = tmp_path / 'collection.sgf'
+    path.write_text('(;SZ[9]C[a (b) \\] c];B[aa];W[bb])\n(;SZ[9]AB[cc];W[dd])\n')
+    games = list(records.read_sgf(str(path), block_size=3))
+    assert [g.moves for g in games] == [[(0, 0), (1, 1)], [(3, 3)]]
+    assert games[1].setup == [(2, 2, True)]
+
+
+def test_journal_rewind(tmp_path):
+    import journal
+    path = str(tmp_path / 'session.journal')
+    log = journal.Journal(path)
+    log.append('start', size=9, speed_go=False)
+    for x in range(3):
+        log.append('move', x=x, y=0)
+    log.append('rewind', moves=1)
+    log.append('move', x=5, y=5)
+    log.append('reset')
+    log.close()
+    game, = records.read_journal(path)
+    assert game.moves == [(0, 0), (5, 5)]
+
+
+def test_malformed_point_drops_the_game():
+    games = parse('(;SZ[9];B[a];W[bb])(;SZ[9];B[cc])')
+    assert [g.moves for g in games] == [[(2, 2)]]
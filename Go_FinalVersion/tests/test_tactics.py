@@ -0,0 +1,46 @@
+import pytest
+
+from tactics import BLACK_STONE, WHITE_STONE, ReadingLimit, TacticalReader
+
+
+def ladder(breaker=False):
+    """White stone at (15, 3) in a ladder running to the lower left of a 19x19 board"""
+    reader = TacticalReader(19)
+    for (x, y) in [(14, 3), (15, 2), (16, 4)]:
+        reader.cells[reader.point(x, y)] = BLACK_STONE
+    reader.cells[reader.point(15, 3)] = WHITE_STONE
+    if breaker:
+        reader.cells[reader.point(7, 11)] = WHITE_STONE
+        reader.cells[reader.point(17, 2)] = WHITE_STONE
+    return reader
+
+
+def test_ladder_works():
+    assert ladder().can_capture(15, 3)
+
+
+def test_ladder_breaker():
+    assert not ladder(breaker=True).can_capture(15, 3)
+
+
+def test_too_little_depth_is_unknown():
+    reader = ladder()
+    cells = reader.cells[:]
+    with pytest.raises(ReadingLimit):
+        reader.can_capture(15, 3, depth=6)
+    # the board is restored
+    assert reader.cells == cells and not reader.history
+
+
+def test_too_few_nodes_is_unknown():
+    with pytest.raises(ReadingLimit):
+        ladder().can_capture(15, 3, node_limit=10)
+
+
+def test_escape_with_too_little_depth_is_unknown():
+    reader = ladder()
+    # white to move in atari after black's first ladder move
+    reader.play(reader.point(15, 4), BLACK_STONE)
+    with pytest.raises(ReadingLimit):
+        reader.escape_move(15, 3, depth=5)
+    assert reader.escape_move(15, 3) is None
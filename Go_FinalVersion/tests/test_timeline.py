@@ -0,0 +1,83 @@
+import random
+
+import pytest
+
+pytest.importorskip('PyQt5.QtCore')
+
+from game_logic import GameLogic
+from timeline import GameTimeline
+
+
+def record_game(size, moves, keyframe_interval, seed):
+    """Plays a random game (with a few passes) into a timeline and returns
+    the timeline and the snapshot after every move, index 0 = empty board"""
+    rng = random.Random(seed)
+    game = GameLogic(size)
+    timeline = GameTimeline(size, keyframe_interval)
+    history = [game.snapshot()]
+    while len(timeline) < moves and not game.game_over:
+        if rng.random() < 0.03:
+            game.passing()
+            timeline.record(game, None)
+        else:
+            move = (rng.randrange(size), rng.randrange(size))
+            if not game.place_stone(*move):
+                continue
+            timeline.record(game, move)
+        history.append(game.snapshot())
+    return timeline, history
+
+
+def shown(timeline):
+    return (timeline.size, bytes(timeline.fields), timeline.state)
+
+
+@pytest.mark.parametrize('interval', [1, 2, 5, 16, 64])
+def test_seek_equals_replay(interval):
+    timeline, history = record_game(9, 150, interval, seed=interval)
+    rng = random.Random(0)
+    for _ in range(300):
+        k = rng.randrange(len(history))
+        timeline.seek(k)
+        assert timeline.position == k
+        assert shown(timeline) == history[k]
+
+
+@pytest.mark.parametrize('interval', [3, 16])
+def test_single_steps_equal_replay(interval):
+    timeline, history = record_game(7, 100, interval, seed=7)
+    for k in list(range(len(history))) + list(reversed(range(len(history)))):
+        timeline.seek(k)
+        assert shown(timeline) == history[k]
+
+
+def test_to_game_continues_like_the_original():
+    timeline, history = record_game(9, 80, 16, seed=3)
+    timeline.seek(40)
+    game = timeline.to_game()
+    assert game.snapshot() == history[40]
+    replay = GameLogic.from_snapshot(history[40])
+    rng = random.Random(1)
+    for _ in range(100):
+        move = (rng.randrange(9), rng.randrange(9))
+        assert game.place_stone(*move) == replay.place_stone(*move)
+        assert game.snapshot() == replay.snapshot()
+
+
+def test_truncate_and_continue():
+    timeline, history = record_game(9, 60, 4, seed=5)
+    timeline.seek(21)
+    timeline.truncate()
+    assert len(timeline) == 21
+    game = timeline.to_game()
+    rng = random.Random(2)
+    while len(timeline) < 40:
+        move = (rng.randrange(9), rng.randrange(9))
+        if game.place_stone(*move):
+            timeline.record(game, move)
+            expected = game.snapshot()
+    timeline.seek(0)
+    timeline.seek(21)
+    assert shown(timeline) == history[21]
+    timeline.seek(40)
+    assert shown(timeline) == expected
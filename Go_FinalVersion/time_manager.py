@@ -0,0 +1,214 @@
+import argparse
+import time
+
+from engine import Engine
+import position_cache
+
+
+class TimeManager(object):
+    """Decides how long a computer player thinks about a move in speed go.
+
+    The remaining clock is spread over the moves that are still expected,
+    more time goes to the middle game and to volatile positions (where the
+    evaluation jumped recently). A search stops early when the best move
+    has been stable for a while and never runs into the hard limit. Close
+    to flag-fall moves are played without searching.
+    Attributes:
+        clock_ms (int): clock time per player at the start of the game
+        safety_ms (int): clock time that is never used (GUI and signal delays)
+        emergency_ms (int): below this the best pattern move is played at once
+        stable_rounds (int): nr. of rounds without a new best move for an early stop
+        volatility (float): running average of the evaluation changes, 0..1
+
+    The evaluations are from the view of the player to move, so each player
+    needs its own TimeManager.
+    """
+
+    def __init__(self, clock_ms=120000, safety_ms=500, emergency_ms=1500, min_think_ms=20,
+                 max_fraction=0.2, stable_rounds=4, length_factor=1.3):
+        self.max_safety_ms = safety_ms
+        self.max_emergency_ms = emergency_ms
+        self.min_think_ms = min_think_ms
+        self.max_fraction = max_fraction
+        self.stable_rounds = stable_rounds
+        self.length_factor = length_factor
+        self.reset(clock_ms)
+
+    def reset(self, clock_ms=None):
+        """Call at the start of a new game, with the clock time if it changed"""
+        if clock_ms is not None:
+            self.clock_ms = clock_ms
+            # short clocks can not spare 2 seconds, the reserves shrink with the clock
+            self.safety_ms = min(self.max_safety_ms, 0.04 * clock_ms)
+            self.emergency_ms = min(self.max_emergency_ms, 0.06 * clock_ms)
+        self.volatility = 0.0
+        self.last_winrate = None
+
+    def expected_moves(self, game):
+        """Estimates how many moves the player to move still has to play.
+        Games last about length_factor * size * size moves because captures
+        refill the board; never less than the empty fields."""
+        empty = sum(1 for row in game.board for grp in row if grp is None)
+        played = game.size * game.size - empty + sum(game.captured)
+        remaining = max(self.length_factor * game.size * game.size - played, empty)
+        return max(remaining / 2.0, 10.0)
+
+    def phase_factor(self, game):
+        """More time for the middle game than for the opening and the end"""
+        filled = 1 - sum(1 for row in game.board for grp in row if grp is None) / float(game.size * game.size)
+        if filled < 0.15:
+            return 0.6
+        if filled < 0.6:
+            return 1.4
+        return 0.8
+
+    def allocate(self, remaining_ms, game):
+        """Returns the (target, hard limit) think time in ms for the next move,
+        (0, 0) in an emergency"""
+        if remaining_ms <= self.emergency_ms:
+            return 0, 0
+        usable = remaining_ms - self.safety_ms
+        target = usable / self.expected_moves(game) * self.phase_factor(game) * (1 + self.volatility)
+        hard = min(target * 3, usable * self.max_fraction)
+        target = max(min(target, hard), self.min_think_ms)
+        return target, max(hard, target)
+
+    def observe(self, winrate):
+        """Updates the volatility with the evaluation of the last search"""
+        if self.last_winrate is not None:
+            change = min(abs(winrate - self.last_winrate) * 4, 1.0)
+            self.volatility = 0.7 * self.volatility + 0.3 * change
+        self.last_winrate = winrate
+
+    def think(self, engine, game, remaining_ms, is_cancelled=None):
+        """Searches a move within the time allocated for the remaining clock.
+
+        Arguments:
+            engine (Engine): the engine that searches
+            game (GameLogic): the position, it is not changed
+            remaining_ms (float): clock time left for the player to move
+            is_cancelled (function): returns True when the result is not needed anymore
+
+        Returns:
+            (tuple): ((x, y) or None, winrate, info dict with the time used,
+                      the nr. of rounds and the reason for stopping)
+        """
+        start = time.perf_counter()
+        target, hard = self.allocate(remaining_ms, game)
+        if hard == 0:
+            return self._emergency_move(engine, game) + ({'ms': 0, 'rounds': 0, 'stop': 'emergency'},)
+
+        book = engine.book_move(game)
+        if book is not None:
+            return book + ({'ms': (time.perf_counter() - start) * 1000, 'rounds': 0, 'stop': 'book'},)
+
+        # a complete earlier search of this position is as good as a new one
+        cache = position_cache.default_cache()
+        cached = cache.get(game, 'move') if cache is not None else None
+        if cached is not None:
+            return cached + ({'ms': (time.perf_counter() - start) * 1000, 'rounds': 0, 'stop': 'cache'},)
+
+        state = {'best': None, 'stable': 0, 'rounds': 0, 'round_ms': 0.0, 'stop': 'playouts'}
+
+        def report(result):
+            state['rounds'] += 1
+            elapsed = (time.perf_counter() - start) * 1000
+            state['round_ms'] = elapsed / state['rounds']
+            if result[0] == state['best']:
+                state['stable'] += 1
+            else:
+                state['best'], state['stable'] = result[0], 0
+
+        def should_stop():
+            if is_cancelled is not None and is_cancelled():
+                state['stop'] = 'cancelled'
+                return True
+            elapsed = (time.perf_counter() - start) * 1000
+            # the next round must still fit into the hard limit
+            if elapsed + state['round_ms'] > hard:
+                state['stop'] = 'hard limit'
+                return True
+            # around the target: stop unless the best move just changed,
+            # in that case take up to half of the target more
+            expected = elapsed + state['round_ms'] / 2
+            if expected >= target and (state['stable'] >= 1 or expected >= 1.5 * target):
+                state['stop'] = 'target'
+                return True
+            if elapsed >= target / 2 and state['stable'] >= self.stable_rounds:
+                state['stop'] = 'stable'
+                return True
+            return False
+
+        (move, winrate), _ = engine.search(game, 10 ** 9, is_cancelled=should_stop, report=report)
+        self.observe(winrate)
+        info = {'ms': (time.perf_counter() - start) * 1000, 'rounds': state['rounds'], 'stop': state['stop']}
+        return move, winrate, info
+
+    def _emergency_move(self, engine, game):
+        """The legal candidate with the highest pattern weight, no playouts"""
+        for (x, y) in engine.candidate_moves(game):
+            if game.copy().place_stone(x, y):
+                return (x, y), 0.5
+        return None, 0.5
+
+
+def simulate(games=10, size=8, clock_ms=20000, seed=0):
+    """Plays engine against engine with a clock for both sides and prints how
+    the time was used. Think time is measured with the real clock.
+
+    Returns:
+        (int): nr. of games lost on time
+    """
+    from game_logic import GameLogic
+
+    flag_falls = 0
+    moves_played = 0
+    think_total = 0.0
+    left_at_end = []
+    stops = {}
+    for g in range(games):
+        game = GameLogic(size)
+        engines = {True: Engine(seed=seed + 2 * g), False: Engine(seed=seed + 2 * g + 1)}
+        managers = {True: TimeManager(clock_ms), False: TimeManager(clock_ms)}
+        clocks = {True: float(clock_ms), False: float(clock_ms)}
+        for _ in range(3 * size * size):
+            if game.game_over:
+                break
+            color = game.turn
+            start = time.perf_counter()
+            move, winrate, info = managers[color].think(engines[color], game, clocks[color])
+            clocks[color] -= (time.perf_counter() - start) * 1000
+            if clocks[color] <= 0:
+                flag_falls += 1
+                break
+            if move is None:
+                game.passing()
+            else:
+                game.place_stone(*move)
+            moves_played += 1
+            think_total += info['ms']
+            stops[info['stop']] = stops.get(info['stop'], 0) + 1
+        left_at_end.append(min(clocks.values()))
+
+    print("{} games on {}x{} with {} ms per side".format(games, size, size, clock_ms))
+    print("lost on time: {}".format(flag_falls))
+    print("average think time: {:.0f} ms over {} moves".format(think_total / max(moves_played, 1), moves_played))
+    print("average clock left at the end: {:.0f} ms".format(sum(left_at_end) / len(left_at_end)))
+    print("stop reasons: {}".format(stops))
+    return flag_falls
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Headless timed engine games')
+    parser.add_argument('--games', type=int, default=10)
+    parser.add_argument('--size', type=int, default=8)
+    parser.add_argument('--clock', type=int, default=20000, help='ms per side')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--cache', default=None, help='keep the position cache in this sqlite file')
+    args = parser.parse_args()
+    if args.cache:
+        position_cache.set_default_cache(position_cache.PositionCache(path=args.cache))
+    simulate(args.games, args.size, args.clock, args.seed)
+    cache = position_cache.default_cache()
+    cache.print_stats()
+    cache.close()
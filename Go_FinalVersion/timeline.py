@@ -0,0 +1,161 @@
+import random
+import sys
+import time
+
+from game_logic import GameLogic
+
+# field values of the compact position, the same as in GameLogic.snapshot
+_EMPTY, _BLACK, _WHITE = 0, 1, 2
+
+
+class GameTimeline(object):
+    """Stores a whole game so that any move can be shown without replaying
+    the game from the start.
+
+    Every keyframe_interval moves a full snapshot of the position is kept,
+    and for every move a small delta (placed stone, captured stones, game
+    state afterwards). Jumping to a move costs at most keyframe_interval
+    deltas, scrubbing one move forward / backward applies a single delta.
+    Attributes:
+        size (int): board size
+        keyframes (list): (fields, state) snapshot of every K-th position
+        deltas (list): (placed field or -1 for a pass, color, captured fields,
+                        state after the move) for every move
+        position (int): the move currently shown, 0 = empty board
+    """
+
+    def __init__(self, size, keyframe_interval=16):
+        self.size = size
+        self.keyframe_interval = keyframe_interval
+        self.fields = bytearray(size * size)
+        # (turn, blocked_field, has_passed, game_over, captured black, captured white)
+        self.state = (True, None, False, False, 0, 0)
+        self.keyframes = [(bytes(self.fields), self.state)]
+        self.deltas = []
+        self.position = 0
+
+    def __len__(self):
+        """nr. of recorded moves"""
+        return len(self.deltas)
+
+    def record(self, logic, move):
+        """Appends a move that has just been played on the live game.
+
+        Arguments:
+            logic (GameLogic): the game after the move
+            move (tuple): the (x, y) of the stone, None for a pass
+        """
+        self.seek(len(self.deltas))
+        if move is None:
+            placed, color, captured = -1, _EMPTY, ()
+        else:
+            x, y = move
+            placed = y * self.size + x
+            color = _EMPTY if logic.board[y][x] is None else (_BLACK if logic.board[y][x].color else _WHITE)
+            captured = tuple(v * self.size + u for (u, v) in logic.last_changes[1:])
+        state = (logic.turn, logic.blocked_field, logic.has_passed, logic.game_over,
+                 logic.captured[0], logic.captured[1])
+        self.deltas.append((placed, color, captured, state))
+        self._forward()
+
+        if self.position % self.keyframe_interval == 0:
+            self.keyframes.append((bytes(self.fields), self.state))
+
+    def _forward(self):
+        """Applies the delta of the next move"""
+        placed, color, captured, state = self.deltas[self.position]
+        if placed >= 0:
+            self.fields[placed] = color
+            for i in captured:
+                self.fields[i] = _EMPTY
+        self.state = state
+        self.position += 1
+
+    def _backward(self):
+        """Undoes the delta of the current move"""
+        self.position -= 1
+        placed, color, captured, state = self.deltas[self.position]
+        if placed >= 0:
+            self.fields[placed] = _EMPTY
+            other = _WHITE if color == _BLACK else _BLACK
+            for i in captured:
+                self.fields[i] = other
+        if self.position > 0:
+            self.state = self.deltas[self.position - 1][3]
+        else:
+            self.state = self.keyframes[0][1]
+
+    def seek(self, position):
+        """Shows the position after the given nr. of moves"""
+        position = max(0, min(position, len(self.deltas)))
+        k = self.keyframe_interval
+
+        # far away: start from the closest keyframe before the target
+        if abs(position - self.position) > k:
+            fields, state = self.keyframes[position // k]
+            self.fields = bytearray(fields)
+            self.state = state
+            self.position = position // k * k
+
+        while self.position < position:
+            self._forward()
+        while self.position > position:
+            self._backward()
+
+    def stones(self):
+        """Returns a nested list (same shape as GameLogic.board) with the colors
+        of the stones of the current position"""
+        colors = {_EMPTY: None, _BLACK: True, _WHITE: False}
+        return [[colors[self.fields[y * self.size + x]] for x in range(self.size)]
+                for y in range(self.size)]
+
+    def to_game(self):
+        """Builds a GameLogic for the current position, e.g. to continue
+        playing or to analyse from there"""
+        return GameLogic.from_snapshot((self.size, bytes(self.fields), self.state))
+
+    def truncate(self):
+        """Drops all moves after the current position, the game continues
+        from here"""
+        del self.deltas[self.position:]
+        del self.keyframes[self.position // self.keyframe_interval + 1:]
+
+    def memory_usage(self):
+        """Approximate nr. of bytes used by the keyframes and deltas"""
+        total = sys.getsizeof(self.keyframes) + sys.getsizeof(self.deltas) + sys.getsizeof(self.fields)
+        for fields, state in self.keyframes:
+            total += sys.getsizeof(fields)
+        for delta in self.deltas:
+            total += sys.getsizeof(delta) + sys.getsizeof(delta[2]) + sys.getsizeof(delta[3])
+        return total
+
+
+def benchmark(size=19, moves=300, jumps=2000, seed=0):
+    """Records a random game and measures random jumps and single steps"""
+    rng = random.Random(seed)
+    game = GameLogic(size)
+    timeline = GameTimeline(size)
+    while len(timeline) < moves:
+        x, y = rng.randrange(size), rng.randrange(size)
+        if game.place_stone(x, y):
+            timeline.record(game, (x, y))
+
+    start = time.perf_counter()
+    for _ in range(jumps):
+        timeline.seek(rng.randrange(moves + 1))
+    jump_time = (time.perf_counter() - start) / jumps
+
+    timeline.seek(0)
+    start = time.perf_counter()
+    for i in range(moves + 1):
+        timeline.seek(i)
+    step_time = (time.perf_counter() - start) / (moves + 1)
+
+    assert timeline.stones() == game._stones()
+    print("{} moves on {}x{}, keyframe every {} moves".format(moves, size, size, timeline.keyframe_interval))
+    print("random jump: {:.1f} us, single step: {:.1f} us".format(jump_time * 1e6, step_time * 1e6))
+    print("timeline memory: {:.1f} kB".format(timeline.memory_usage() / 1024))
+
+
+if __name__ == '__main__':
+    benchmark()
@@ -0,0 +1,228 @@
+import multiprocessing
+import queue
+import time
+import traceback
+
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+
+from engine import Engine, estimate_ownership
+from game_logic import GameLogic, BLACK, WHITE
+from opening_book import OpeningBook
+from patterns import default_table
+import position_cache
+from time_manager import TimeManager
+
+
+# state of an engine process, set up by _init_process
+_process = {}
+
+
+def _init_process(generation, results):
+    """Runs once in every engine process.
+
+    Arguments:
+        generation (multiprocessing.RawValue): the generation of the current
+            position, written by the GUI process, read to cancel old jobs
+        results (multiprocessing.Queue): progress and results go back here
+    """
+    _process['generation'] = generation
+    _process['results'] = results
+    # the book is memory-mapped, all engine processes read the same pages
+    book = OpeningBook.open_default()
+    _process['engine'] = Engine(book=book)
+    _process['ponder_engine'] = Engine(book=book)
+    position_cache.set_default_cache(position_cache.open_default())
+    # the pattern table takes a second to build, do it now instead of
+    # when the engine is asked for the first time
+    default_table()
+
+
+def _genmove(game, is_cancelled, report, playouts, deadline_ms, remaining_ms, time_manager, requested):
+    """Returns the move, the color that moved and its time manager, whose
+    state changed while thinking. The clock kept running since the move was
+    requested (time.time() in the GUI process), that wait is not think time."""
+    color = game.turn
+    waited_ms = max(0.0, (time.time() - requested) * 1000.0)
+    if remaining_ms is not None:
+        remaining_ms -= waited_ms
+    if deadline_ms is not None:
+        deadline_ms = max(0.0, deadline_ms - waited_ms)
+    if remaining_ms is not None:
+        move, winrate, info = time_manager.think(_process['engine'], game, remaining_ms, is_cancelled)
+    else:
+        deadline = None
+        if deadline_ms is not None:
+            deadline = time.perf_counter() + deadline_ms / 1000.0
+        move, winrate = _process['engine'].genmove(game, playouts, deadline, is_cancelled)
+    return move, color, time_manager
+
+
+def _ponder(game, is_cancelled, report, playouts):
+    return _process['ponder_engine'].genmove(game, playouts, None, is_cancelled, report)
+
+
+def _ownership(game, is_cancelled, report, playouts):
+    return estimate_ownership(game, playouts, is_cancelled=is_cancelled, report=report)
+
+
+def _score(game, is_cancelled, report):
+    return game.score_game()
+
+
+JOBS = {'move': _genmove, 'ponder': _ponder, 'ownership': _ownership, 'score': _score}
+
+
+def _run(job_id, generation, name, snapshot, args):
+    """Runs one job in an engine process. The job function is called as
+    function(game, is_cancelled, report, *args) and has to check
+    is_cancelled() regularly; report(value) sends an intermediate result."""
+    results = _process['results']
+
+    def is_cancelled():
+        return generation is not None and generation != _process['generation'].value
+
+    def report(value):
+        if not is_cancelled():
+            results.put(('progress', job_id, value))
+
+    value = None
+    if not is_cancelled():
+        try:
+            game = GameLogic.from_snapshot(snapshot, patterns=True)
+            value = JOBS[name](game, is_cancelled, report, *args)
+        except Exception:
+            traceback.print_exc()
+    # also sent when cancelled, the worker drops results of old positions
+    results.put(('finished', job_id, value))
+
+
+class AnalysisWorker(QObject):
+    """Runs engine moves, pondering and scoring in separate processes.
+
+    The playouts are pure python, in threads of the GUI process they would
+    hold the GIL and starve the event loop (and the speed go clocks, which
+    count timer events). The jobs get a snapshot of the position, their
+    progress and results come back through a queue that a QTimer drains in
+    the GUI thread, where they are emitted as signals.
+
+    When the position changes all jobs of the old position are cancelled
+    through a shared generation counter and their results are dropped, so
+    the signals always carry the result for the latest position.
+    """
+    move_ready = pyqtSignal(object)    # (x, y) or None for a pass
+    ponder_ready = pyqtSignal(object)  # (move, winrate), refined while pondering
+    score_ready = pyqtSignal(object)   # (score, positionScored)
+    ownership_ready = pyqtSignal(object)  # flat list from -1 (white) to 1 (black), refined in batches
+
+    def __init__(self, parent=None, analysis_processes=1, poll_ms=10):
+        super().__init__(parent)
+        # spawn: a forked copy of the GUI process would inherit its threads
+        context = multiprocessing.get_context('spawn')
+        self.shared_generation = context.RawValue('i', 0)
+        self.results = context.Queue()
+        initargs = (self.shared_generation, self.results)
+        # moves and scores get a process of their own, they never queue
+        # behind pondering or ownership jobs
+        self.move_pool = context.Pool(1, initializer=_init_process, initargs=initargs)
+        self.analysis_pool = context.Pool(analysis_processes, initializer=_init_process, initargs=initargs)
+        # one per player, the evaluations are from the view of the player to move
+        self.time_managers = {BLACK: TimeManager(), WHITE: TimeManager()}
+        self.generation = 0
+        self.next_id = 0
+        self.jobs = {}  # job id -> (name, generation or None)
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self._poll)
+        self.timer.start(poll_ms)
+
+    def new_game(self, clock_ms=None):
+        """Resets the time managers, clock_ms: the clock of each player in speed go"""
+        for time_manager in self.time_managers.values():
+            time_manager.reset(clock_ms)
+
+    def position_changed(self):
+        """Cancels all jobs that belong to the previous position"""
+        self.generation += 1
+        self.shared_generation.value = self.generation
+
+    def _is_cancelled(self, job_id):
+        name, generation = self.jobs[job_id]
+        return generation is not None and generation != self.generation
+
+    def _start(self, name, game, args=(), cancellable=True):
+        job_id = self.next_id
+        self.next_id += 1
+        generation = self.generation if cancellable else None
+        self.jobs[job_id] = (name, generation)
+        pool = self.move_pool if name in ('move', 'score') else self.analysis_pool
+        pool.apply_async(_run, (job_id, generation, name, game.snapshot(), args))
+
+    def request_move(self, game, playouts=None, deadline_ms=None, remaining_ms=None):
+        """Generates an engine move for the player to move, see move_ready.
+        With remaining_ms (speed go) the think time comes from the time manager,
+        otherwise the search stops after deadline_ms or the playouts. The time
+        until an engine process picks the job up counts against both."""
+        self._start('move', game, (playouts, deadline_ms, remaining_ms, self.time_managers[game.turn],
+                                   time.time()))
+
+    def ponder(self, game, playouts=2000):
+        """Analyses the position while the player thinks, see ponder_ready"""
+        self._start('ponder', game, (playouts,))
+
+    def request_ownership(self, game, playouts=512):
+        """Estimates the territory with batched playouts, see ownership_ready"""
+        self._start('ownership', game, (playouts,))
+
+    def request_score(self, game):
+        """Scores the game, see score_ready. Not cancelled by position
+        changes, since the game is usually reset right after it ended."""
+        self._start('score', game, cancellable=False)
+
+    def _poll(self):
+        """Delivers what the engine processes sent, called by the timer"""
+        while True:
+            try:
+                kind, job_id, value = self.results.get_nowait()
+            except queue.Empty:
+                return
+            if job_id not in self.jobs:
+                continue
+            if kind == 'progress':
+                self._progress(job_id, value)
+            else:
+                self._finished(job_id, value)
+
+    def _progress(self, job_id, value):
+        if self._is_cancelled(job_id):
+            return
+        name = self.jobs[job_id][0]
+        if name == 'ponder':
+            self.ponder_ready.emit(value)
+        elif name == 'ownership':
+            self.ownership_ready.emit(value)
+
+    def _finished(self, job_id, value):
+        cancelled = self._is_cancelled(job_id)
+        name = self.jobs.pop(job_id)[0]
+        if cancelled:
+            return
+        if name == 'move':
+            if value is None:
+                return
+            move, color, time_manager = value
+            self.time_managers[color] = time_manager
+            self.move_ready.emit(move)
+        elif name == 'ponder':
+            self.ponder_ready.emit(value)
+        elif name == 'score':
+            self.score_ready.emit(value)
+        elif name == 'ownership':
+            self.ownership_ready.emit(value)
+
+    def shutdown(self):
+        """Cancels everything and stops the engine processes"""
+        self.position_changed()
+        self.timer.stop()
+        for pool in (self.move_pool, self.analysis_pool):
+            pool.terminate()
+            pool.join()